@@ -10,6 +10,7 @@ with DAG(
     tags=["baw"]
 ) as dag:
     gen = BashOperator(task_id="generate_data", bash_command="python scripts/generate_data.py")
+    validate = BashOperator(task_id="validate_raw", bash_command="python scripts/validate_raw.py")
     load = BashOperator(task_id="load_to_duckdb", bash_command="python scripts/load_to_duckdb.py")
     dbt_deps = BashOperator(task_id="dbt_deps", bash_command="dbt deps")
     dbt_run = BashOperator(task_id="dbt_run", bash_command="dbt run")
@@ -17,4 +18,4 @@ with DAG(
     fraud = BashOperator(task_id="fraud", bash_command="python scripts/fraud_isoforest.py")
     churn = BashOperator(task_id="churn", bash_command="python scripts/churn_baseline.py")
     atm = BashOperator(task_id="atm", bash_command="python scripts/atm_forecast.py")
-    gen >> load >> dbt_deps >> dbt_run >> dbt_test >> [fraud, churn, atm]
+    gen >> validate >> load >> dbt_deps >> dbt_run >> dbt_test >> [fraud, churn, atm]
@@ -2,6 +2,7 @@ import streamlit as st
 import duckdb, pandas as pd, numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
+from pathlib import Path
 from plotly.subplots import make_subplots
 
 # ---------------- Session / Page ----------------
@@ -426,16 +427,16 @@ st.markdown('<div class="section-header">Key Performance Indicators</div>', unsa
 try:
     n_customers = con.execute("select count(*) from dim_customer").fetchone()[0]
     tx_7d = con.execute("""
-      select coalesce(sum(amount),0)
-      from fact_transactions
-      where ts::date >= current_date - INTERVAL 7 DAY
+      select coalesce(sum(amount_sum),0)
+      from agg_tx_daily
+      where d >= current_date - INTERVAL 7 DAY
     """).fetchone()[0]
     
     # Get previous period for trend calculation
     tx_14d = con.execute("""
-      select coalesce(sum(amount),0)
-      from fact_transactions
-      where ts::date >= current_date - INTERVAL 14 DAY AND ts::date < current_date - INTERVAL 7 DAY
+      select coalesce(sum(amount_sum),0)
+      from agg_tx_daily
+      where d >= current_date - INTERVAL 14 DAY AND d < current_date - INTERVAL 7 DAY
     """).fetchone()[0]
     
     tx_trend = ((tx_7d - tx_14d) / tx_14d * 100) if tx_14d > 0 else 0
@@ -458,12 +459,13 @@ except Exception as e:
 # Fraud and churn data
 alerts = 0; churn_risk = 0.0
 try:
-    fraud = pd.read_parquet("data/outputs/fraud_scores.parquet")
-    alerts = int((fraud["fraud_score"] > np.quantile(fraud["fraud_score"], 0.99)).sum())
+    # Maintained by fraud_isoforest.py from a score histogram, so no score part is read here
+    alerts = int(con.execute("select alerts from fraud_alert_stats").fetchone()[0])
 except Exception:
     pass
 try:
-    churn = pd.read_parquet("data/outputs/churn_predictions.parquet")
+    latest = max(Path("data/outputs/churn_predictions").glob("as_of=*"))  # one partition per scored date
+    churn = pd.read_parquet(latest, columns=["churn_prob"])
     churn_risk = float((churn['churn_prob'] > 0.5).mean()*100)
 except Exception:
     pass
@@ -533,9 +535,9 @@ win_days = int(window[:-1])
 # Enhanced transaction volume chart
 try:
     daily = con.execute(f"""
-      select ts::date as d, sum(amount) as amt, count(*) as tx_count
-      from fact_transactions
-      where ts::date >= current_date - INTERVAL {win_days} DAY
+      select d, sum(amount_sum) as amt, sum(tx_cnt) as tx_count
+      from agg_tx_daily
+      where d >= current_date - INTERVAL {win_days} DAY
       group by 1 order by 1
     """).fetch_df()
     
@@ -673,24 +675,14 @@ except Exception as e:
 st.markdown('<div class="section-header">Fraud Detection & Risk Analysis</div>', unsafe_allow_html=True)
 
 try:
-    tx = con.execute("select tx_id, customer_id, amount, ts from fact_transactions").fetch_df()
-    fraud = pd.read_parquet("data/outputs/fraud_scores.parquet")
-    
-    # Merge and get top fraud cases
-    top = (tx.merge(fraud, on=["customer_id","amount"], how="inner")
-             .sort_values("fraud_score", ascending=False)
-             .head(50)[["tx_id","customer_id","amount","ts","fraud_score"]])
-    
-    # Enhanced risk tiers with better categorization
-    q95 = top["fraud_score"].quantile(0.95)
-    q80 = top["fraud_score"].quantile(0.80)
-    
-    def tier(s):
-        if s >= q95: return "Critical"
-        if s >= q80: return "High"
-        return "Medium"
-    
-    top["risk_tier"] = top["fraud_score"].apply(tier)
+    # Maintained by fraud_isoforest.py: top scores per scope with risk tiers already assigned
+    top = con.execute("""
+      select tx_id, customer_id, amount, ts, fraud_score, risk_tier
+      from fraud_alerts_topk
+      where scope = 'global' and scope_key = 'all'
+      order by rank
+      limit 50
+    """).fetch_df()
     top["ts"] = pd.to_datetime(top["ts"])
     
     # Risk distribution chart
@@ -0,0 +1,27 @@
+{{
+  config(
+    materialized='incremental',
+    unique_key=['customer_id','d'],
+    incremental_strategy='delete+insert'
+  )
+}}
+-- One row per customer per active day; churn activity windows are sums over this instead of the fact table.
+-- amount_m2 is the day's sum of squared deviations from its own mean, so days combine exactly into
+-- per-customer moments (Chan et al. parallel variance) without rescanning transactions.
+select
+  customer_id,
+  cast(ts as date) as d,
+  count(*) as tx_cnt,
+  sum(amount) as amount_sum,
+  var_pop(amount) * count(*) as amount_m2,
+  count(*) filter (where channel = 'POS') as pos_cnt,
+  count(*) filter (where channel = 'ATM') as atm_cnt,
+  count(*) filter (where channel = 'E-TRANSFER') as etransfer_cnt,
+  count(*) filter (where channel = 'BILL') as bill_cnt,
+  count(*) filter (where channel = 'ONLINE') as online_cnt
+from {{ ref('fact_transactions') }}
+{% if is_incremental() %}
+where ts >= (select max(d) from {{ this }}) - INTERVAL {{ var('fact_lookback_days') }} DAY
+{% endif %}
+group by 1, 2
+order by 2
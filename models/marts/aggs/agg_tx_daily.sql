@@ -0,0 +1,22 @@
+{{
+  config(
+    materialized='incremental',
+    unique_key=['d','branch_id','channel'],
+    incremental_strategy='delete+insert'
+  )
+}}
+-- Daily transaction rollup (date x branch x channel) serving the dashboard's KPI cards and volume chart.
+-- Incremental runs recompute whole days from the lookback onwards, so distinct counts stay exact.
+select
+  cast(ts as date) as d,
+  branch_id,
+  channel,
+  sum(amount) as amount_sum,
+  count(*) as tx_cnt,
+  count(distinct customer_id) as customer_cnt
+from {{ ref('fact_transactions') }}
+{% if is_incremental() %}
+where ts >= (select max(d) from {{ this }}) - INTERVAL {{ var('fact_lookback_days') }} DAY
+{% endif %}
+group by 1, 2, 3
+order by 1
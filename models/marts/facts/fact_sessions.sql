@@ -1,3 +1,10 @@
+{{
+  config(
+    materialized='incremental',
+    unique_key='session_id',
+    incremental_strategy='delete+insert'
+  )
+}}
 select
   cast(session_id as integer) as session_id,
   cast(customer_id as integer) as customer_id,
@@ -7,3 +14,6 @@ select
   cast(events_count as integer) as events_count,
   cast(conv_flag as integer) as conv_flag
 from {{ source('raw','digital_sessions') }}
+{% if is_incremental() %}
+where cast(start_ts as timestamp) >= (select max(start_ts) from {{ this }}) - INTERVAL {{ var('fact_lookback_days') }} DAY
+{% endif %}
@@ -1,2 +1,15 @@
+{{
+  config(
+    materialized='incremental',
+    unique_key='tx_id',
+    incremental_strategy='delete+insert'
+  )
+}}
 select tx_id, customer_id, account_id, branch_id, amount, channel, merchant_code, ts
 from {{ ref('stg_transactions') }}
+{% if is_incremental() %}
+-- only the new tail of history, re-reading a lookback window so late-arriving rows are picked up
+where ts >= (select max(ts) from {{ this }}) - INTERVAL {{ var('fact_lookback_days') }} DAY
+{% endif %}
+-- stored in ts order so the min/max zone maps skip row groups outside time-window filters
+order by ts
@@ -0,0 +1,72 @@
+{{ config(materialized='table') }}
+-- Per-customer feature store shared by fraud_isoforest.py and churn_baseline.py.
+-- Amount moments merge the per-day (n, sum, m2) triples of agg_customer_daily, so rebuilding this table only
+-- reads the incremental rollup, never fact_transactions.
+with daily as (
+  select *,
+    amount_sum / tx_cnt as day_mean,
+    sum(amount_sum) over (partition by customer_id) / sum(tx_cnt) over (partition by customer_id) as amt_mean
+  from {{ ref('agg_customer_daily') }}
+),
+tx as (
+  select
+    customer_id,
+    cast(sum(tx_cnt) as bigint) as tx_cnt,
+    any_value(amt_mean) as amt_mean,
+    sum(amount_m2 + tx_cnt * (day_mean - amt_mean) ^ 2) as amt_m2,
+    sum(case when d >= current_date - INTERVAL 30 DAY then tx_cnt else 0 end)::bigint as tx_last_30,
+    sum(case when d <  current_date - INTERVAL 30 DAY
+              and d >= current_date - INTERVAL 120 DAY then tx_cnt else 0 end)::bigint as tx_prev_120,
+    sum(case when d >= current_date - INTERVAL 30 DAY then amount_sum else 0 end) as amount_last_30,
+    sum(pos_cnt) / sum(tx_cnt) as pos_share,
+    sum(atm_cnt) / sum(tx_cnt) as atm_share,
+    sum(etransfer_cnt) / sum(tx_cnt) as etransfer_share,
+    sum(bill_cnt) / sum(tx_cnt) as bill_share,
+    sum(online_cnt) / sum(tx_cnt) as online_share,
+    max(d) as last_tx_date
+  from daily
+  group by 1
+),
+sessions as (
+  select
+    customer_id,
+    count(*) as sessions_total,
+    count(*) filter (where start_ts >= current_date - INTERVAL 30 DAY) as sessions_last_30,
+    avg(duration_s) as session_duration_avg,
+    avg(events_count) as session_events_avg,
+    avg(conv_flag) as session_conv_rate
+  from {{ ref('fact_sessions') }}
+  group by 1
+),
+tickets as (
+  select
+    cast(customer_id as integer) as customer_id,
+    count(*) as tickets_total,
+    count(*) filter (where cast(created_ts as timestamp) >= current_date - INTERVAL 120 DAY) as tickets_last_120,
+    count(*) filter (where priority = 'High') as tickets_high,
+    count(*) filter (where sentiment = 'neg') as tickets_negative
+  from {{ source('raw','support_tickets') }}
+  group by 1
+)
+select
+  c.customer_id, c.age, c.tenure_months, c.risk_score,
+  coalesce(t.tx_cnt, 0) as tx_cnt,
+  t.amt_mean,
+  t.amt_m2,
+  case when t.tx_cnt > 1 then sqrt(t.amt_m2 / (t.tx_cnt - 1)) end as amt_std,
+  coalesce(t.tx_last_30, 0) as tx_last_30,
+  coalesce(t.tx_prev_120, 0) as tx_prev_120,
+  coalesce(t.amount_last_30, 0) as amount_last_30,
+  t.pos_share, t.atm_share, t.etransfer_share, t.bill_share, t.online_share,
+  t.last_tx_date,
+  coalesce(s.sessions_total, 0) as sessions_total,
+  coalesce(s.sessions_last_30, 0) as sessions_last_30,
+  s.session_duration_avg, s.session_events_avg, s.session_conv_rate,
+  coalesce(k.tickets_total, 0) as tickets_total,
+  coalesce(k.tickets_last_120, 0) as tickets_last_120,
+  coalesce(k.tickets_high, 0) as tickets_high,
+  coalesce(k.tickets_negative, 0) as tickets_negative
+from {{ ref('dim_customer') }} c
+left join tx t using (customer_id)
+left join sessions s using (customer_id)
+left join tickets k using (customer_id)
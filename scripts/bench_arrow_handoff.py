@@ -0,0 +1,55 @@
+"""Wall time and peak RSS of generate -> CSV -> load_to_duckdb versus the in-process Arrow hand-off, per scale factor.
+Usage: python scripts/bench_arrow_handoff.py --scale-factors 0.1 1 3
+"""
+import argparse, json, subprocess, sys, tempfile, time
+from pathlib import Path
+
+OUT = Path("data/outputs"); OUT.mkdir(parents=True, exist_ok=True)
+NOW = "2025-01-01T00:00:00"
+
+def run_case(path, sf, workdir):
+    import numpy as np
+    import load_to_duckdb
+    from generate_and_load import DuckDBSink
+    from common import peak_rss_mb
+    from generate_data import CsvSink, generate, scale_profile
+    db = (workdir/"bench.duckdb").as_posix(); now = np.datetime64(NOW, "us")
+    t0 = time.perf_counter()
+    if path == "csv":
+        counts = generate(CsvSink(workdir), scale_profile(sf), now=now)
+        load_to_duckdb.RAW_PATH = workdir
+        con = load_to_duckdb.connect(db)
+        for table in load_to_duckdb.files:
+            load_to_duckdb.load_table(con, table, full_refresh=True)
+    else:
+        con = load_to_duckdb.connect(db)
+        counts = generate(DuckDBSink(con), scale_profile(sf), now=now)
+    con.execute("CHECKPOINT;"); con.close()
+    return {"path": path, "scale_factor": sf, "rows": sum(counts.values()),
+            "wall_s": round(time.perf_counter() - t0, 3), "peak_rss_mb": round(peak_rss_mb(), 1)}
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--scale-factors", type=float, nargs="+", default=[0.1, 1, 3])
+    ap.add_argument("--case", nargs=2, metavar=("PATH", "SF"), help=argparse.SUPPRESS)  # child-process entry point
+    args = ap.parse_args(argv)
+
+    if args.case:
+        with tempfile.TemporaryDirectory() as d:
+            print(json.dumps(run_case(args.case[0], float(args.case[1]), Path(d))))
+        return
+
+    results = []
+    for sf in args.scale_factors:
+        for path in ("csv", "arrow"):  # a fresh interpreter per case, so peak RSS is per case
+            out = subprocess.run([sys.executable, __file__, "--case", path, str(sf)], check=True,
+                                 capture_output=True, text=True).stdout
+            results.append(json.loads(out.strip().splitlines()[-1]))
+            r = results[-1]
+            print(f"SF{sf:g} {path:>5}: {r['rows']:>12,} rows  {r['wall_s']:>8.2f}s  "
+                  f"{r['rows']/max(r['wall_s'],1e-9):>12,.0f} rows/sec  peak RSS {r['peak_rss_mb']:>8,.0f} MB")
+    OUT.joinpath("bench_arrow_handoff.json").write_text(json.dumps(results, indent=2))
+    print("Saved benchmark -> data/outputs/bench_arrow_handoff.json")
+
+if __name__ == "__main__":
+    main()
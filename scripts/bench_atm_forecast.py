@@ -0,0 +1,60 @@
+"""Speed and accuracy of the ATM forecast engines: a rolling-origin backtest of SARIMAX against the vectorized ones.
+Usage: python scripts/bench_atm_forecast.py [--origins 4] [--workers 4] [--engines sarimax holt_winters]
+"""
+import argparse, duckdb, json, os, time
+import numpy as np, pandas as pd
+from pathlib import Path
+from atm_forecast import DB_PATH, ENGINES, STEPS, run_fast, run_sarimax
+
+OUT = Path("data/outputs"); OUT.mkdir(parents=True, exist_ok=True)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--engines", nargs="+", choices=ENGINES, default=ENGINES)
+    ap.add_argument("--origins", type=int, default=4, help="backtest cutoffs, one week apart, ending a week before the last day")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="SARIMAX pool size")
+    ap.add_argument("--timeout", type=float, default=60.0, help="SARIMAX seconds per branch before the 7-day-mean fallback")
+    ap.add_argument("--branches", type=int, help="only the first N branches")
+    args = ap.parse_args(argv)
+
+    with duckdb.connect(DB_PATH, read_only=True) as con:
+        df = con.execute("select branch_id, date::date as d, cash_withdrawn from main_marts.fact_atm_demand "
+                         "where ? is null or branch_id in (select distinct branch_id from main_marts.fact_atm_demand "
+                         "order by 1 limit ?) order by branch_id, d", [args.branches, args.branches]).fetch_df()
+    df["d"] = pd.to_datetime(df["d"]); last = df["d"].max()
+    cutoffs = [last - pd.Timedelta(days=STEPS * k) for k in range(args.origins, 0, -1)]
+    runs = {e: {"seconds": 0.0, "errors": []} for e in args.engines}
+    for cutoff in cutoffs:
+        train = df[df["d"] <= cutoff]
+        actual = df[(df["d"] > cutoff) & (df["d"] <= cutoff + pd.Timedelta(days=STEPS))].rename(columns={"d": "date"})
+        for e in args.engines:
+            t0 = time.perf_counter()
+            if e == "sarimax":
+                fc, _ = run_sarimax(train, args.workers, timeout=args.timeout, cache=False)
+            else:
+                fc, _ = run_fast(train, e)
+            runs[e]["seconds"] += time.perf_counter() - t0
+            m = actual.merge(fc.astype({"branch_id": "int64"}).assign(date=pd.to_datetime(fc["date"])),
+                             on=["branch_id", "date"], how="left")
+            runs[e]["errors"].append(np.column_stack([m["cash_withdrawn"], m["cash_forecast"]]))
+
+    n_branches = df["branch_id"].nunique(); results = []
+    for e, r in runs.items():
+        a, f = np.concatenate(r["errors"]).T; err = f - a
+        results.append({"engine": e, "seconds": round(r["seconds"], 4),
+                        "branches_per_sec": round(n_branches * len(cutoffs) / r["seconds"], 1),
+                        "mae": round(float(np.nanmean(np.abs(err))), 3), "rmse": round(float(np.sqrt(np.nanmean(err ** 2))), 3),
+                        "wape": round(float(np.nansum(np.abs(err)) / np.nansum(np.abs(a))), 5),
+                        "missing_forecasts": int(np.isnan(f).sum())})
+    base = next((r for r in results if r["engine"] == "sarimax"), None)
+    for r in results:
+        vs = f"  {base['seconds'] / r['seconds']:>8.1f}x SARIMAX speed" if base and r is not base else ""
+        print(f"{r['engine']:<15} {r['seconds']:>8.3f}s ({r['branches_per_sec']:>12,.1f} branches/sec)  "
+              f"MAE {r['mae']:>10,.2f}  RMSE {r['rmse']:>10,.2f}  WAPE {r['wape']:.4f}{vs}")
+    OUT.joinpath("bench_atm_forecast.json").write_text(json.dumps(
+        {"branches": n_branches, "cutoffs": [str(c.date()) for c in cutoffs], "horizon_days": STEPS,
+         "sarimax_workers": args.workers, "engines": results}, indent=2))
+    print("Saved benchmark -> data/outputs/bench_atm_forecast.json")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Latency and throughput of fraud_online.OnlineScorer against the persisted model, plus a parity check.
+Usage: python scripts/bench_fraud_online.py [--transactions 20000] [--batch-sizes 1 16 256 4096]
+"""
+import argparse, duckdb, joblib, json, time
+import numpy as np
+from pathlib import Path
+from fraud_isoforest import DB_PATH, MODEL_PATH
+from fraud_online import OnlineScorer
+
+OUT = Path("data/outputs"); OUT.mkdir(parents=True, exist_ok=True)
+
+def percentiles_us(ns):
+    return {f"p{q}": round(float(np.percentile(ns, q)) / 1e3, 2) for q in (50, 90, 99)} | {"mean": round(float(np.mean(ns)) / 1e3, 2)}
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--transactions", type=int, default=20_000)
+    ap.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 16, 256, 4096])
+    args = ap.parse_args(argv)
+
+    with duckdb.connect(DB_PATH, read_only=True) as con:
+        tx = con.execute("select customer_id, amount from main_marts.fact_transactions order by ts desc limit ?",
+                         [args.transactions]).fetchnumpy()
+    ids, amounts = tx["customer_id"].astype(np.int64), tx["amount"].astype(np.float64)
+    scorer = OnlineScorer.from_warehouse(); clf = joblib.load(MODEL_PATH)["model"]
+
+    x = np.column_stack([amounts, scorer.stats.z(ids, amounts)])
+    parity = float(np.abs(scorer.forest.score(x) + clf.decision_function(x)).max())
+
+    ns = np.empty(len(ids), np.int64); perf = time.perf_counter_ns
+    for i, (c, a) in enumerate(zip(ids.tolist(), amounts.tolist())):
+        t0 = perf(); scorer.score(c, a); ns[i] = perf() - t0
+    single = percentiles_us(ns)
+    base = np.empty(min(len(x), 1000), np.int64)
+    for i in range(len(base)):
+        t0 = perf(); clf.decision_function(x[i:i+1]); base[i] = perf() - t0
+    sklearn_single = percentiles_us(base)
+
+    batches = []
+    for b in args.batch_sizes:
+        t0 = time.perf_counter(); n = 0
+        for lo in range(0, len(ids), b):
+            scorer.score_batch(ids[lo:lo+b], amounts[lo:lo+b]); n += len(ids[lo:lo+b])
+        dt = time.perf_counter() - t0
+        batches.append({"batch_size": b, "rows_per_sec": round(n / dt), "us_per_batch": round(dt / -(-n // b) * 1e6, 1)})
+
+    result = {"model_version": scorer.version, "transactions": len(ids), "parity_max_abs_diff": parity,
+              "single_us": single, "sklearn_single_us": sklearn_single, "micro_batches": batches}
+    print(f"parity vs sklearn: max |diff| = {parity:.2e}")
+    print(f"single transaction: p50 {single['p50']} us  p99 {single['p99']} us  "
+          f"(sklearn decision_function p50 {sklearn_single['p50']} us)")
+    for r in batches:
+        print(f"batch {r['batch_size']:>5}: {r['rows_per_sec']:>12,} rows/sec  {r['us_per_batch']:>10,.1f} us/batch")
+    OUT.joinpath("bench_fraud_online.json").write_text(json.dumps(result, indent=2))
+    print("Saved benchmark -> data/outputs/bench_fraud_online.json")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Fraud training and scoring wall time against core count, with a check against the serial path.
+Usage: python scripts/bench_fraud_parallel.py --cores 1 2 4 8 [--stratify customer]
+"""
+import argparse, duckdb, json, os, tempfile, time
+import numpy as np, pyarrow.parquet as pq
+from pathlib import Path
+from fraud_isoforest import DB_PATH, EPOCH, STRATA, build, sample, score
+
+OUT = Path("data/outputs"); OUT.mkdir(parents=True, exist_ok=True)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--cores", type=int, nargs="+", default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    ap.add_argument("--sample-rows", type=int, default=200_000)
+    ap.add_argument("--batch-rows", type=int, default=100_000, help="rows per scoring task")
+    ap.add_argument("--stratify", choices=sorted(STRATA))
+    args = ap.parse_args(argv)
+
+    con = duckdb.connect(DB_PATH, read_only=True)
+    t0 = time.perf_counter(); x = sample(con, EPOCH, args.sample_rows, args.stratify); sample_s = time.perf_counter() - t0
+    results, serial = [], None
+    with tempfile.TemporaryDirectory() as d:
+        for cores in [1] + [c for c in args.cores if c != 1]:
+            t0 = time.perf_counter(); clf = build(x, cores); fit_s = time.perf_counter() - t0
+            path = Path(d)/f"scores-{cores}.parquet"
+            t0 = time.perf_counter(); n, _ = score(con, {"model": clf, "version": 0}, EPOCH, args.batch_rows, cores, path)
+            score_s = time.perf_counter() - t0
+            s = pq.read_table(path, columns=["tx_id", "fraud_score"])
+            if serial is None:
+                serial = s
+            diff = float(np.abs(s["fraud_score"].to_numpy() - serial["fraud_score"].to_numpy()).max())
+            same_rows = s["tx_id"].equals(serial["tx_id"])
+            results.append({"cores": cores, "rows": n, "fit_s": round(fit_s, 3), "score_s": round(score_s, 3),
+                            "rows_per_sec": round(n / score_s), "max_abs_diff_vs_serial": diff,
+                            "same_row_order": same_rows})
+            r = results[-1]
+            print(f"{cores:>3} cores: fit {fit_s:>6.2f}s ({fit_s and results[0]['fit_s']/fit_s:.2f}x)  score {score_s:>7.2f}s "
+                  f"({results[0]['score_s']/score_s:.2f}x, {r['rows_per_sec']:>10,} rows/sec)  "
+                  f"max |diff| vs serial {diff:.1e}{'' if same_rows else '  ROW ORDER DIFFERS'}")
+    OUT.joinpath("bench_fraud_parallel.json").write_text(json.dumps(
+        {"sample_rows": len(x), "stratify": args.stratify, "sample_s": round(sample_s, 3), "runs": results}, indent=2))
+    print("Saved benchmark -> data/outputs/bench_fraud_parallel.json")
+    if any(r["max_abs_diff_vs_serial"] > 1e-12 or not r["same_row_order"] for r in results):
+        raise SystemExit("parallel scores differ from the serial path")
+
+if __name__ == "__main__":
+    main()
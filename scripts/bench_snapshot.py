@@ -0,0 +1,68 @@
+"""Time of `dbt snapshot` for snap_dim_customer against customer count and the fraction of customers changed.
+Usage: python scripts/bench_snapshot.py --customers 10000 100000 1000000 --change-rates 0 0.01 0.1
+"""
+import argparse, duckdb, json, os, tempfile
+import numpy as np
+from contextlib import contextmanager
+from pathlib import Path
+from dbt.cli.main import dbtRunner
+from generate_data import SEED, gen_customers, to_arrow
+from raw_schema import create_table_sql
+
+OUT = Path("data/outputs"); OUT.mkdir(parents=True, exist_ok=True)
+NOW = np.datetime64("2025-01-01T00:00:00", "us")
+
+@contextmanager
+def warehouse_path(db):
+    """Point .dbt/profiles.yml at db for in-process dbt runs, restoring any BAW_DB_PATH the caller had set."""
+    prev = os.environ.get("BAW_DB_PATH"); os.environ["BAW_DB_PATH"] = db
+    try:
+        yield db
+    finally:
+        if prev is None:
+            os.environ.pop("BAW_DB_PATH", None)
+        else:
+            os.environ["BAW_DB_PATH"] = prev
+
+def dbt(runner, *args):
+    """dbt's own node execution time, so start-up and parsing are excluded."""
+    res = runner.invoke([*args, "--profiles-dir", ".dbt", "--quiet"])
+    if not res.success:
+        raise RuntimeError(f"dbt {' '.join(args)} failed: {res.exception}")
+    return sum(r.execution_time for r in res.result.results)
+
+def snapshot_size(db):
+    with duckdb.connect(db) as con:
+        return con.execute("select count(*) from snapshots.snap_dim_customer").fetchone()[0]
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--customers", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    ap.add_argument("--change-rates", type=float, nargs="+", default=[0, 0.01, 0.1])
+    args = ap.parse_args(argv)
+
+    runner = dbtRunner(); results = []
+    for n in args.customers:
+        # a fresh warehouse per customer count: initial snapshot, then one incremental snapshot per change rate
+        with tempfile.TemporaryDirectory() as d, warehouse_path(f"{d}/bench.duckdb") as db:
+            with duckdb.connect(db) as con:
+                con.execute("CREATE SCHEMA raw;"); con.execute(create_table_sql("customers"))
+                con.register("_chunk", to_arrow(gen_customers(1, n, NOW, np.random.default_rng(SEED))))
+                con.execute("INSERT INTO raw.customers BY NAME SELECT * FROM _chunk;")
+            dbt(runner, "run", "-s", "stg_customers")
+            t = dbt(runner, "snapshot")
+            results.append({"customers": n, "change_rate": None, "snapshot_s": round(t, 3), "rows": snapshot_size(db)})
+            print(f"{n:>10,} customers  initial       {t:>7.2f}s")
+            for i, rate in enumerate(args.change_rates):
+                with duckdb.connect(db) as con:
+                    con.execute("UPDATE raw.customers SET risk_score = risk_score + 1 "
+                                "WHERE hash(customer_id, ?) % 1000000 < ?", [i, int(rate * 1_000_000)])
+                t = dbt(runner, "snapshot")
+                results.append({"customers": n, "change_rate": rate, "snapshot_s": round(t, 3), "rows": snapshot_size(db)})
+                print(f"{n:>10,} customers  {rate:>6.1%} changed {t:>7.2f}s  "
+                      f"{n/max(t,1e-9):>12,.0f} customers/sec  snapshot rows {results[-1]['rows']:,}")
+    OUT.joinpath("bench_snapshot.json").write_text(json.dumps(results, indent=2))
+    print("Saved benchmark -> data/outputs/bench_snapshot.json")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""How many row groups DuckDB's min/max zone maps let a time-window query skip on the transaction tables.
+Usage: python scripts/bench_zonemap.py [--windows 7 14 30 60 90 120]
+"""
+import argparse, duckdb, json, re, time
+from pathlib import Path
+
+DB_PATH = "data/warehouse/baw.duckdb"
+OUT = Path("data/outputs"); OUT.mkdir(parents=True, exist_ok=True)
+STATS = re.compile(r"Min: ([^,\]]+), Max: ([^,\]]+)")
+
+def row_group_ranges(con, table, column="ts"):
+    ranges = {}
+    for rg, stats in con.execute(f"select row_group_id, stats from pragma_storage_info('{table}') where column_name = ?",
+                                 [column]).fetchall():
+        m = STATS.search(stats or "")
+        if m:
+            lo, hi = ranges.get(rg, (m.group(1), m.group(2)))
+            ranges[rg] = (min(lo, m.group(1)), max(hi, m.group(2)))
+    return ranges
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--windows", type=int, nargs="+", default=[7, 14, 30, 60, 90, 120])
+    args = ap.parse_args(argv)
+
+    con = duckdb.connect(DB_PATH)
+    # generator emission order (by tx_id, i.e. grouped by customer) is the unclustered baseline
+    con.execute("CREATE OR REPLACE TABLE raw._bench_unclustered AS SELECT * FROM raw.transactions ORDER BY tx_id;")
+    con.execute("CHECKPOINT;")
+    tables = ["raw._bench_unclustered", "raw.transactions", "main_marts.fact_transactions"]
+    end = con.execute("select max(ts) from raw.transactions").fetchone()[0]
+    results = []
+    try:
+        for table in tables:
+            ranges = row_group_ranges(con, table)
+            for days in args.windows:
+                start = con.execute(f"select ?::timestamp - INTERVAL {days} DAY", [end]).fetchone()[0]
+                scanned = sum(1 for lo, hi in ranges.values() if hi >= str(start))
+                t0 = time.perf_counter()
+                con.execute(f"select count(*), sum(amount) from {table} where ts >= ?", [start]).fetchone()
+                ms = (time.perf_counter() - t0) * 1000
+                results.append({"table": table, "window_days": days, "row_groups": len(ranges),
+                                "row_groups_scanned": scanned, "row_groups_skipped": len(ranges) - scanned,
+                                "query_ms": round(ms, 2)})
+                print(f"{table:<30} {days:>4}d: {len(ranges)-scanned:>5}/{len(ranges):<5} row groups skipped  {ms:8.2f} ms")
+    finally:
+        con.execute("DROP TABLE IF EXISTS raw._bench_unclustered;")
+    OUT.joinpath("bench_zonemap.json").write_text(json.dumps(results, indent=2))
+    print("Saved benchmark -> data/outputs/bench_zonemap.json")
+
+if __name__ == "__main__":
+    main()
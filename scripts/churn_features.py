@@ -0,0 +1,146 @@
+"""Point-in-time churn features and labels for many as-of dates in one pass over agg_customer_daily.
+Usage: python scripts/churn_features.py --as-of 2025-06-30 2025-07-31 [--refresh]
+"""
+import argparse, duckdb, hashlib, json, time
+import pandas as pd, pyarrow as pa, pyarrow.parquet as pq
+from datetime import timedelta
+from pathlib import Path
+from common import dbt_var
+
+DB_PATH = "data/warehouse/baw.duckdb"
+CACHE = Path("data/cache/churn_features")
+ATTRIBUTES = ["age", "tenure_months", "risk_score"]  # current dim_customer values, not point-in-time
+WINDOWS = ["tx_last_30", "tx_prev_120"]
+FEATURES = WINDOWS + ATTRIBUTES
+
+# Activity windows only: they depend on the as-of date alone, so they are what gets cached
+WINDOW_SQL = """
+with as_of_dates as (select unnest(?::DATE[]) as as_of),
+first_tx as (select customer_id, min(d) as first_d from agg_customer_daily group by 1),
+windows as (
+  select a.as_of, d.customer_id,
+    sum(case when d.d >= a.as_of - INTERVAL 30 DAY then d.tx_cnt else 0 end) as tx_last_30,
+    sum(case when d.d < a.as_of - INTERVAL 30 DAY then d.tx_cnt else 0 end) as tx_prev_120
+  from agg_customer_daily d
+  join as_of_dates a on d.d >= a.as_of - INTERVAL 120 DAY and d.d <= a.as_of
+  group by 1, 2
+)
+select a.as_of, f.customer_id,
+  coalesce(w.tx_last_30, 0)::BIGINT as tx_last_30,
+  coalesce(w.tx_prev_120, 0)::BIGINT as tx_prev_120
+from as_of_dates a
+join first_tx f on f.first_d <= a.as_of
+left join windows w on w.as_of = a.as_of and w.customer_id = f.customer_id
+"""
+ATTRIBUTE_SQL = f"select customer_id, {', '.join(ATTRIBUTES)} from dim_customer"
+PIT_SQL = f"""
+select w.*, {', '.join('c.' + a for a in ATTRIBUTES)}
+from ({WINDOW_SQL}) w left join dim_customer c on c.customer_id = w.customer_id
+order by 1, 2
+"""
+
+# Everything the labelled rows for a set of as-of dates are computed from, as order-independent aggregates
+FINGERPRINT_SQL = f"""
+select count(*), sum(tx_cnt), bit_xor(hash(customer_id, d, tx_cnt)),
+  (select bit_xor(hash(customer_id, {', '.join(ATTRIBUTES)})) from dim_customer)
+from agg_customer_daily where d <= ?
+"""
+
+# Per as-of date, the same aggregates over the rollup rows its windows are computed from (d <= as_of)
+STAMP_SQL = """
+with as_of_dates as (select unnest(?::DATE[]) as as_of),
+days as (
+  select d, count(*) as n, sum(tx_cnt) as tx, bit_xor(hash(customer_id, d, tx_cnt)) as h
+  from agg_customer_daily where d <= (select max(as_of) from as_of_dates) group by 1
+)
+select a.as_of, coalesce(sum(n), 0), coalesce(sum(tx), 0), coalesce(bit_xor(h), 0)
+from as_of_dates a left join days on days.d <= a.as_of
+group by 1
+"""
+
+def cache_path(as_of):
+    return CACHE/f"as_of={as_of}.parquet"
+
+def label(df):
+    """churn_90d per as-of date: quiet recently, active historically. The thresholds relax when a date has too few
+    positives, and the bottom 10% by tx_last_30 is the last resort."""
+    out = []
+    for _, g in df.groupby("as_of", sort=False):
+        y = (g["tx_last_30"] <= 1) & (g["tx_prev_120"] >= 8)
+        if y.sum() < 20:
+            y = (g["tx_last_30"] <= 2) & (g["tx_prev_120"] >= 6)
+        if y.sum() == 0:
+            y = g["tx_last_30"] <= g["tx_last_30"].quantile(0.10)
+        out.append(y.astype(int))
+    return pd.concat(out).reindex(df.index) if out else pd.Series(dtype=int)
+
+def final_before(con, lookback_days):
+    """Dates before this have windows the incremental models will not rewrite: they re-read the last lookback_days."""
+    last = con.execute("select max(d) from agg_customer_daily").fetchone()[0]
+    return last - timedelta(days=lookback_days) if last is not None else None
+
+def default_as_of(con, lookback_days=None):
+    """The latest date whose windows are final, so runs without --as-of agree until new data lands."""
+    con.execute("SET schema 'main_marts'")
+    final = final_before(con, dbt_var("fact_lookback_days", 3) if lookback_days is None else lookback_days)
+    if final is None:
+        raise SystemExit("agg_customer_daily is empty; run dbt first")
+    return final - timedelta(days=1)
+
+def fingerprint(con, as_of_dates):
+    """Hash of the inputs build() would read for these dates, from one aggregate scan instead of the frame itself."""
+    dates = sorted({pd.Timestamp(d).date() for d in as_of_dates})
+    con.execute("SET schema 'main_marts'")
+    inputs = con.execute(FINGERPRINT_SQL, [dates[-1]]).fetchone()
+    key = json.dumps([FEATURES, [str(d) for d in dates], *inputs], default=str)
+    return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+
+def rollup_stamps(con, dates):
+    """{as_of: stamp of the agg_customer_daily rows up to it}; a cached date is only reused while its stamp matches."""
+    rows = con.execute(STAMP_SQL, [dates]).fetchall() if dates else []
+    return {d: json.dumps(r, default=str) for d, *r in rows}
+
+def cached_stamp(as_of):
+    path = cache_path(as_of)
+    return (pq.read_schema(path).metadata or {}).get(b"rollup", b"").decode() if path.exists() else None
+
+def build(con, as_of_dates, refresh=False, lookback_days=None):
+    """Features for all requested as-of dates: cached windows whose rollup rows are unchanged are read back, the rest
+    are computed in one query, and the current dim_customer attributes are joined on at read time."""
+    dates = sorted({pd.Timestamp(d).date() for d in as_of_dates})
+    con.execute("SET schema 'main_marts'")
+    stamps = rollup_stamps(con, dates)
+    todo = [d for d in dates if refresh or cached_stamp(d) != stamps[d]]
+    parts = [pd.read_parquet(cache_path(d), columns=["as_of", "customer_id"] + WINDOWS) for d in dates if d not in todo]
+    if todo:
+        new = con.execute(WINDOW_SQL, [todo]).fetch_df()
+        new["as_of"] = pd.to_datetime(new["as_of"]).dt.date
+        final = final_before(con, dbt_var("fact_lookback_days", 3) if lookback_days is None else lookback_days)
+        CACHE.mkdir(parents=True, exist_ok=True)
+        for d, g in new.groupby("as_of"):
+            if final is not None and d < final:
+                t = pa.Table.from_pandas(g, preserve_index=False)
+                t = t.replace_schema_metadata({**t.schema.metadata, b"rollup": stamps[d].encode()})
+                pq.write_table(t, cache_path(d))
+        parts.append(new)
+    df = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=["as_of", "customer_id"] + WINDOWS)
+    df = df.sort_values(["as_of", "customer_id"], ignore_index=True).merge(
+        con.execute(ATTRIBUTE_SQL).fetch_df(), on="customer_id", how="left")
+    df["churn_90d"] = label(df)
+    return df
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--as-of", nargs="+", help="as-of dates (YYYY-MM-DD; default: the latest final day)")
+    ap.add_argument("--refresh", action="store_true", help="recompute cached as-of dates")
+    args = ap.parse_args(argv)
+
+    con = duckdb.connect(DB_PATH, read_only=True); t0 = time.perf_counter()
+    df = build(con, args.as_of or [default_as_of(con)], args.refresh)
+    dt = time.perf_counter() - t0
+    for d, g in df.groupby("as_of"):
+        print(f"as of {d}: {len(g):,} customers, {int(g['churn_90d'].sum()):,} churn labels")
+    print(f"{len(df):,} (customer, as-of) rows in {dt:.2f}s")
+
+if __name__ == "__main__":
+    main()
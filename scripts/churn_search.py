@@ -0,0 +1,116 @@
+"""Churn model search: models x regularization strengths, grouped k-fold CV on a process pool over a cached memmap.
+Usage: python scripts/churn_search.py --as-of 2025-03-31 2025-04-30 [--folds 5] [--workers 4] [--models logreg hist_gb]
+"""
+import argparse, duckdb, json, os, time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import StratifiedGroupKFold
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+from threadpoolctl import threadpool_limits
+from churn_features import FEATURES, build, default_as_of, fingerprint
+
+DB_PATH = "data/warehouse/baw.duckdb"
+OUT = Path("data/outputs"); OUT.mkdir(parents=True, exist_ok=True)
+CACHE = Path("data/cache/churn_search")
+SEED = 42
+
+# model -> (regularization parameter, values, factory)
+GRID = {
+    "logreg": ("C", [0.01, 0.1, 1.0, 10.0],
+               lambda v: make_pipeline(StandardScaler(), LogisticRegression(C=v, max_iter=500))),
+    "logreg_l1": ("C", [0.01, 0.1, 1.0],
+                  lambda v: make_pipeline(StandardScaler(), LogisticRegression(C=v, penalty="l1", solver="liblinear"))),
+    "hist_gb": ("l2_regularization", [0.0, 1.0, 10.0],
+                lambda v: HistGradientBoostingClassifier(l2_regularization=v, max_iter=100, random_state=SEED)),
+    "random_forest": ("min_samples_leaf", [1, 10, 50],
+                      lambda v: RandomForestClassifier(n_estimators=100, min_samples_leaf=v, n_jobs=1, random_state=SEED)),
+}
+
+def matrix(con, as_of, refresh=False):
+    """(X float32 memmap, y uint8 memmap, customer ids) for the as-of dates, built on the first call only."""
+    dates = sorted({str(np.datetime64(d, "D")) for d in as_of})
+    key = fingerprint(con, dates)[:16]  # changes with the feature list, the dates, the daily rollup or dim_customer
+    meta_path = CACHE/f"{key}.json"
+    if refresh or not meta_path.exists():
+        df = build(con, dates)
+        CACHE.mkdir(parents=True, exist_ok=True)
+        x = np.lib.format.open_memmap(CACHE/f"{key}.X.npy", "w+", np.float32, (len(df), len(FEATURES)))
+        x[:] = df[FEATURES].fillna(0).to_numpy(np.float32); x.flush(); del x
+        np.save(CACHE/f"{key}.y.npy", df["churn_90d"].to_numpy(np.uint8))
+        np.save(CACHE/f"{key}.groups.npy", df["customer_id"].to_numpy(np.int64))
+        meta_path.write_text(json.dumps({"features": FEATURES, "as_of": dates, "rows": len(df)}))
+    return [CACHE/f"{key}.{p}.npy" for p in ("X", "y", "groups")]
+
+_x = _y = None
+
+def _init_worker(x_path, y_path):
+    global _x, _y
+    _x = np.load(x_path, mmap_mode="r"); _y = np.load(y_path, mmap_mode="r")
+    threadpool_limits(1)  # the pool is the parallelism; keep BLAS / OpenMP inside each fit single-threaded
+
+def _fit_fold(model, value, train, test):
+    clf = GRID[model][2](value)
+    t0 = time.perf_counter(); clf.fit(_x[train], _y[train]); fit_s = time.perf_counter() - t0
+    x = np.ascontiguousarray(_x[test])
+    t0 = time.perf_counter(); p = clf.predict_proba(x)[:, 1]; predict_s = time.perf_counter() - t0
+    return roc_auc_score(_y[test], p), fit_s, predict_s, len(test)
+
+def search(paths, models, folds, workers):
+    y = np.load(paths[1]); groups = np.load(paths[2])
+    splits = list(StratifiedGroupKFold(folds, shuffle=True, random_state=SEED).split(np.zeros(len(y)), y, groups))
+    candidates = [(m, v) for m in models for v in GRID[m][1]]
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=paths[:2]) as pool:
+        futures = {(m, v): [pool.submit(_fit_fold, m, v, tr, te) for tr, te in splits] for m, v in candidates}
+        results = []
+        for (m, v), fs in futures.items():
+            auc, fit_s, predict_s, rows = map(np.array, zip(*[f.result() for f in fs]))
+            results.append({"model": m, GRID[m][0]: v, "auc_mean": round(float(auc.mean()), 5),
+                            "auc_std": round(float(auc.std()), 5), "fit_s": round(float(fit_s.mean()), 4),
+                            "predict_us_per_row": round(float(predict_s.sum() / rows.sum() * 1e6), 4)})
+    for r in results:
+        a, c = r["auc_mean"], r["predict_us_per_row"]
+        r["pareto"] = not any(o["auc_mean"] >= a and o["predict_us_per_row"] <= c and
+                              (o["auc_mean"] > a or o["predict_us_per_row"] < c) for o in results)
+    return sorted(results, key=lambda r: (-r["auc_mean"], r["predict_us_per_row"]))
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--as-of", nargs="+",
+                    help="as-of dates (YYYY-MM-DD) pooled into the training set (default: the latest final day)")
+    ap.add_argument("--models", nargs="+", choices=list(GRID), default=list(GRID))
+    ap.add_argument("--folds", type=int, default=5)
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processes running (candidate, fold) fits")
+    ap.add_argument("--refresh", action="store_true", help="rebuild the cached feature matrix")
+    args = ap.parse_args(argv)
+
+    t0 = time.perf_counter()
+    with duckdb.connect(DB_PATH, read_only=True) as con:
+        as_of = args.as_of or [str(default_as_of(con))]
+        paths = matrix(con, as_of, args.refresh)
+    x = np.load(paths[0], mmap_mode="r"); matrix_s = time.perf_counter() - t0
+    y = np.load(paths[1], mmap_mode="r")
+    if len(np.unique(y)) < 2:
+        print("Warning: only one class in churn labels; adjust thresholds or regenerate data."); return
+    print(f"Feature matrix {x.shape[0]:,} x {x.shape[1]} float32 ({x.nbytes / 2**20:,.1f} MB) ready in {matrix_s:.2f}s "
+          f"-> {paths[0]}")
+    t0 = time.perf_counter(); results = search(paths, args.models, args.folds, args.workers)
+    search_s = time.perf_counter() - t0
+    for r in results:
+        param = GRID[r["model"]][0]
+        print(f"{r['model']:<14} {param + '=' + str(r[param]):<24} AUC {r['auc_mean']:.4f} ± {r['auc_std']:.4f}  "
+              f"fit {r['fit_s']:>7.3f}s  predict {r['predict_us_per_row']:>8.3f} µs/row{'  *' if r['pareto'] else ''}")
+    print(f"{len(results)} candidates x {args.folds} folds in {search_s:.2f}s on {args.workers} worker(s); "
+          f"* = pareto (no other candidate at least as accurate and as cheap to score)")
+    OUT.joinpath("churn_model_search.json").write_text(json.dumps(
+        {"as_of": sorted(as_of), "rows": int(x.shape[0]), "features": FEATURES, "folds": args.folds,
+         "workers": args.workers, "matrix_s": round(matrix_s, 3), "search_s": round(search_s, 3),
+         "candidates": results}, indent=2))
+    print("Saved model search -> data/outputs/churn_model_search.json")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Small helpers shared by the scripts in this directory."""
+import yaml
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+DBT_PROJECT = Path("dbt_project.yml")
+
+def dbt_var(name, default=None):
+    """A var from dbt_project.yml, so a script re-reads the same window the incremental models do."""
+    if not DBT_PROJECT.exists():
+        return default
+    return (yaml.safe_load(DBT_PROJECT.read_text()).get("vars") or {}).get(name, default)
+
+def peak_rss_mb():
+    """Peak resident set size in MB of this process or its largest child."""
+    try:
+        import resource
+        kb = max(resource.getrusage(who).ru_maxrss for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN))
+        return kb / 1024  # KB on Linux; largest single process when shards run in a pool
+    except ImportError:
+        return float("nan")
+
+def record_batches(con, sql, batch_rows, params=None):
+    """A query's result as a stream of Arrow record batches of batch_rows rows."""
+    res = con.execute(sql, params)  # to_arrow_reader replaced fetch_record_batch in DuckDB 1.4
+    return res.to_arrow_reader(batch_rows) if hasattr(res, "to_arrow_reader") else res.fetch_record_batch(batch_rows)
+
+_state = None
+
+def _init_worker(state):
+    global _state
+    _state = state
+
+def _call(fn, x):
+    return fn(_state, x)
+
+def ordered_map(fn, state, items, workers=1, payload=lambda item: item):
+    """(item, fn(state, payload(item))) in input order. With workers > 1 the calls run in a process pool that
+    received state once; at most 2 x workers items are in flight, so memory stays bounded."""
+    if workers <= 1:
+        for item in items:
+            yield item, fn(state, payload(item))
+        return
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(state,)) as pool:
+        pending = deque()
+        for item in items:
+            pending.append((item, pool.submit(_call, fn, payload(item))))
+            if len(pending) > 2 * workers:
+                i, f = pending.popleft(); yield i, f.result()
+        while pending:
+            i, f = pending.popleft(); yield i, f.result()
@@ -1,18 +1,152 @@
-import duckdb, json
+"""Declarative data quality rules over the raw tables, compiled into one aggregate scan per table.
+Usage: python scripts/data_quality.py [--sample 1] [tables ...]
+"""
+import argparse, duckdb, json, math, time
 from pathlib import Path
+from raw_schema import RAW_SCHEMAS
 
 DB_PATH = "data/warehouse/baw.duckdb"
 OUT = Path("data/outputs"); OUT.mkdir(parents=True, exist_ok=True)
-con = duckdb.connect(DB_PATH)
+Z = 1.96  # 95% two-sided
 
-checks = {}
-def q(name, sql):
-    checks[name] = con.execute(sql).fetchone()[0]
+RULES = {
+    "customers": [
+        {"check": "range", "column": "age", "min": 18, "max": 120},
+        {"check": "range", "column": "tenure_months", "min": 0},
+        {"check": "range", "column": "risk_score", "min": 300, "max": 850},
+    ],
+    "accounts": [
+        {"check": "references", "columns": ["customer_id"], "table": "customers"},
+    ],
+    "branches": [
+        {"check": "range", "column": "lat", "min": -90, "max": 90},
+        {"check": "range", "column": "lon", "min": -180, "max": 180},
+    ],
+    "transactions": [
+        {"check": "positive", "column": "amount"},
+        {"check": "references", "columns": ["account_id", "customer_id"], "table": "accounts"},  # tx -> account -> owner
+        {"check": "references", "columns": ["customer_id"], "table": "customers"},
+        {"check": "references", "columns": ["branch_id"], "table": "branches"},
+        {"check": "freshness", "column": "ts", "max_age_days": 2},
+    ],
+    "digital_sessions": [
+        {"check": "references", "columns": ["customer_id"], "table": "customers"},
+        {"check": "range", "column": "duration_s", "min": 0},
+        {"check": "range", "column": "conv_flag", "min": 0, "max": 1},
+        {"check": "freshness", "column": "start_ts", "max_age_days": 2},
+    ],
+    "support_tickets": [
+        {"check": "references", "columns": ["customer_id"], "table": "customers"},
+        {"check": "range", "column": "sla_hours", "min": 0},
+        {"check": "freshness", "column": "created_ts", "max_age_days": 7},
+    ],
+    "atm_withdrawals": [
+        {"check": "references", "columns": ["branch_id"], "table": "branches"},
+        {"check": "range", "column": "cash_withdrawn", "min": 0},
+        {"check": "freshness", "column": "date", "max_age_days": 2},
+    ],
+}
 
-q("customers_null_ids", "select count(*) from raw.customers where customer_id is null")
-q("customers_duplicate_ids", "select count(*) - count(distinct customer_id) from raw.customers")
-q("transactions_nulls", "select count(*) from raw.transactions where tx_id is null or customer_id is null or amount is null")
-q("transactions_nonpositive", "select count(*) from raw.transactions where amount <= 0")
+def table_rules(table):
+    spec = RAW_SCHEMAS[table]
+    return ([{"check": "not_null", "column": c} for c in spec["not_null"]]
+            + [{"check": "unique", "columns": spec["primary_key"]}] + RULES.get(table, []))
 
-OUT.joinpath('data_quality_summary.json').write_text(json.dumps(checks, indent=2))
-print(json.dumps(checks, indent=2))
+def rule_name(table, r):
+    cols = "_".join(r.get("columns") or [r["column"]])
+    return f"{table}.{cols}.{r['check']}" + (f"_{r['table']}" if r["check"] == "references" else "")
+
+def compile_table(table, rules, sample=None, seed=42):
+    """One SELECT over the table returning [rows, one failure count (or max value for freshness) per rule].
+    Each references rule left-joins the parent's distinct keys, which can't duplicate rows."""
+    exprs, joins = ["count(*)"], []
+    for i, r in enumerate(rules):
+        c = f"t.{r['column']}" if "column" in r else None
+        if r["check"] == "not_null":
+            exprs.append(f"count_if({c} IS NULL)")
+        elif r["check"] == "unique":
+            exprs.append(f"count(*) - count(DISTINCT ({', '.join('t.'+k for k in r['columns'])}))")
+        elif r["check"] == "positive":
+            exprs.append(f"count_if({c} <= 0)")
+        elif r["check"] == "range":
+            bad = [f"{c} {op} {r[k]}" for k, op in (("min", "<"), ("max", ">")) if k in r]
+            exprs.append(f"count_if({' OR '.join(bad)})")
+        elif r["check"] == "references":
+            keys = r.get("keys", r["columns"]); alias = f"p{i}"
+            on = " AND ".join(f"t.{c} = {alias}.{k}" for c, k in zip(r["columns"], keys))
+            joins.append(f"LEFT JOIN (SELECT DISTINCT {', '.join(keys)} FROM raw.{r['table']}) {alias} ON {on}")
+            present = " AND ".join(f"t.{c} IS NOT NULL" for c in r["columns"])
+            exprs.append(f"count_if({present} AND {alias}.{keys[0]} IS NULL)")
+        elif r["check"] == "freshness":
+            exprs.append(f"max({c})")
+        else:
+            raise ValueError(f"unknown check {r['check']!r} on raw.{table}")
+    src = f"raw.{table}" if sample is None else f"(SELECT * FROM raw.{table} USING SAMPLE {sample} PERCENT (bernoulli, {seed}))"
+    return f"SELECT {', '.join(exprs)} FROM {src} t " + " ".join(joins)
+
+def wilson(failed, n, z=Z):
+    if n == 0:
+        return 0.0, 0.0
+    p = failed / n; d = 1 + z*z/n
+    centre = (p + z*z/(2*n)) / d; half = z * math.sqrt(p*(1-p)/n + z*z/(4*n*n)) / d
+    return max(0.0, centre - half), min(1.0, centre + half)
+
+def run_table(con, table, sample=None, sample_min_rows=1_000_000):
+    """Results for every rule on one table. Rules share the table's scan, so each one reports that scan's time."""
+    rules = table_rules(table)
+    total = con.execute(f"SELECT count(*) FROM raw.{table}").fetchone()[0]
+    sampled = sample is not None and total >= sample_min_rows
+    if sampled:  # duplicates in a sample don't scale to the table and a sample's max understates freshness
+        exact = [r for r in rules if r["check"] == "freshness"]
+        rules = [r for r in rules if r["check"] not in ("unique", "freshness")]
+    out = []
+    for batch, pct in ([(rules, sample), (exact, None)] if sampled else [(rules, None)]):
+        if not batch:
+            continue
+        t0 = time.perf_counter()
+        vals = con.execute(compile_table(table, batch, pct)).fetchone()
+        dt = round(time.perf_counter() - t0, 4); n = vals[0]
+        for r, v in zip(batch, vals[1:]):
+            res = {"rule": rule_name(table, r), "table": table, "check": r["check"], "rows_scanned": n,
+                   "table_rows": total, "sampled": pct is not None, "scan_seconds": dt}
+            if r["check"] == "freshness":
+                age = con.execute("SELECT date_diff('hour', ?::timestamp, now()::timestamp) / 24.0", [v]).fetchone()[0] if v is not None else None
+                age = None if age is None else round(age, 2)
+                res.update(latest=str(v), age_days=age, failed=int(age is None or age > r["max_age_days"]))
+            elif pct is None:
+                res.update(failed=int(v), failed_rate=v / max(n, 1))
+            else:
+                lo, hi = wilson(v, n)
+                res.update(failed_in_sample=int(v), failed=round(v / max(n, 1) * total),
+                           failed_ci=[math.floor(lo * total), math.ceil(hi * total)], failed_rate=v / max(n, 1))
+            res["passed"] = res["failed"] == 0
+            out.append(res)
+    skipped = [r for r in table_rules(table) if r["check"] == "unique"] if sampled else []
+    out += [{"rule": rule_name(table, r), "table": table, "check": r["check"], "sampled": True, "skipped": True,
+             "passed": None} for r in skipped]
+    return out
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sample", type=float, metavar="PCT", help="check large tables on a PCT%% row sample")
+    ap.add_argument("--sample-min-rows", type=int, default=1_000_000, help="only sample tables at least this big")
+    ap.add_argument("tables", nargs="*", default=list(RAW_SCHEMAS))
+    args = ap.parse_args(argv)
+
+    con = duckdb.connect(DB_PATH, read_only=True); t0 = time.perf_counter()
+    results = []
+    for table in args.tables:
+        results += run_table(con, table, args.sample, args.sample_min_rows)
+    failed = [r["rule"] for r in results if r["passed"] is False]
+    summary = {"seconds": round(time.perf_counter() - t0, 3), "rules": len(results), "failed": failed,
+               "results": {r.pop("rule"): r for r in results}}
+    OUT.joinpath('data_quality_summary.json').write_text(json.dumps(summary, indent=2, default=str))
+    for name, r in summary["results"].items():
+        status = "SKIP" if r.get("skipped") else "PASS" if r["passed"] else "FAIL"
+        detail = ("" if r.get("skipped") else f"latest={r['latest']} age_days={r['age_days']}" if r["check"] == "freshness"
+                  else f"failed={r['failed']:,}" + (f" ci={r['failed_ci']}" if "failed_ci" in r else ""))
+        print(f"{status}  {name:<52} {detail}")
+    print(f"{len(results)} rules, {len(failed)} failed in {summary['seconds']:.2f}s -> data/outputs/data_quality_summary.json")
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,258 @@
-import duckdb, pandas as pd, numpy as np
+"""IsolationForest fraud scores for fact_transactions, refit only when needed and scored incrementally.
+Usage: python scripts/fraud_isoforest.py [--refit] [--rescore-all] [--top-k 50] [--workers 4]
+"""
+import argparse, duckdb, hashlib, joblib, json, shutil, time
+import numpy as np, pyarrow as pa, pyarrow.parquet as pq
+from datetime import datetime, timedelta
 from sklearn.ensemble import IsolationForest
 from pathlib import Path
+from common import dbt_var, ordered_map, record_batches
 
 DB_PATH = "data/warehouse/baw.duckdb"
 OUT = Path("data/outputs"); OUT.mkdir(parents=True, exist_ok=True)
-con = duckdb.connect(DB_PATH)
+SCORES = OUT/"fraud_scores"
+MODEL_PATH = Path("data/models/fraud_isoforest.joblib")
+SEED = 42
+FEATURE_NAMES = ["amount", "z"]
 
-tx = con.execute("""select customer_id, amount, ts
-from main_marts.fact_transactions
-""").fetch_df()
+# z-score against the customer's amount moments from the customer_features mart; std 0 counts as 1 and
+# a missing std (single-transaction customers) gives z = 0
+FEATURES_SQL = """select t.tx_id, t.customer_id, t.branch_id, t.channel, t.amount, t.ts,
+  coalesce((t.amount - f.amt_mean) / case when f.amt_std = 0 then 1 else f.amt_std end, 0) as z
+from main_marts.fact_transactions t
+join main_marts.customer_features f using (customer_id)
+where t.ts > ?
+"""
+EPOCH = datetime(1970, 1, 1)
 
-feat = tx.groupby("customer_id")["amount"].agg(["mean","std"]).rename(columns={"mean":"amt_mean","std":"amt_std"})
-tx = tx.join(feat, on="customer_id")
-tx["z"] = (tx["amount"] - tx["amt_mean"]) / tx["amt_std"].replace(0, 1)
+def features(batch):
+    return np.column_stack([np.asarray(batch[c]) for c in FEATURE_NAMES])
 
-X = tx[["amount","z"]].fillna(0).to_numpy()
-clf = IsolationForest(contamination=0.01, random_state=42).fit(X)
-tx["fraud_score"] = -clf.decision_function(X)
+STRATA = {"customer": "customer_id", "channel": "channel"}
+OVERSAMPLE = 4  # a stratified sample windows over at most ~4x its size, pre-filtered by tx_id hash
+PSI_ROWS = 100_000
+ALERT_SHARE = 0.01  # the dashboard's Alerts KPI: scores in the top 1% of everything scored
+SCORE_BINS = 10_000  # histogram bins per unit of fraud_score behind fraud_alert_stats
 
-tx_out = tx[["customer_id","amount","z","fraud_score"]]
-tx_out.to_parquet(OUT/"fraud_scores.parquet", index=False)
-print("Saved fraud scores -> data/outputs/fraud_scores.parquet")
+def sample(con, after, rows, stratify=None):
+    """Reservoir sample of the features, or with stratify an equal quota of rows per customer / per channel, so a
+    few very active customers or one dominant channel don't make up most of the training data. Never more than rows;
+    with more strata than rows, a hash-chosen subset of strata gets one row each."""
+    cols = ", ".join(FEATURE_NAMES); rows = int(rows)
+    if stratify is None:
+        sql = f"select {cols} from ({FEATURES_SQL}) using sample reservoir({rows} rows) repeatable ({SEED})"
+        return features(con.execute(sql, [after]).fetchnumpy())
+    key = STRATA[stratify]
+    total, strata = con.execute(f"select count(*), count(distinct {key}) from ({FEATURES_SQL})", [after]).fetchone()
+    quota = -(-rows // max(strata, 1)); keep = int(min(1.0, OVERSAMPLE * rows / max(total, 1)) * 1_000_000)
+    sql = (f"select {cols} from ("
+           f"  select *, row_number() over (partition by {key} order by h) as rn from ("
+           f"    select *, hash(tx_id, {SEED}) as h from ({FEATURES_SQL})) where h % 1000000 < {keep}"
+           f") where rn <= {quota} order by rn, hash({key}, {SEED}), h limit {rows}")
+    return features(con.execute(sql, [after]).fetchnumpy())
+
+def drift_sample(con, after):
+    """The one sampler behind both the PSI reference saved with a model and the drift check against it."""
+    return sample(con, after, PSI_ROWS)
+
+def fingerprint(con):
+    """Identifies the training data: row count, ts range and an order-independent hash of the tx_ids."""
+    n, lo, hi, h = con.execute("select count(*), min(ts), max(ts), sum(hash(tx_id)) from main_marts.fact_transactions").fetchone()
+    return {"rows": n, "min_ts": str(lo), "max_ts": str(hi),
+            "hash": hashlib.blake2b(f"{n}|{lo}|{hi}|{h}".encode(), digest_size=16).hexdigest()}
+
+def bin_shares(edges, col):
+    return np.bincount(np.searchsorted(edges, col, side="right"), minlength=len(edges) + 1) / max(len(col), 1)
+
+def psi_reference(x, bins=10):
+    """Per feature: decile edges of the training sample and its share in each bin."""
+    ref = []
+    for col in x.T:
+        edges = np.unique(np.quantile(col, np.linspace(0, 1, bins + 1)[1:-1]))
+        ref.append((edges, bin_shares(edges, col)))
+    return ref
+
+def psi(ref, x):
+    """Largest population stability index over the features of x against the training reference."""
+    out = []
+    for (edges, p), col in zip(ref, x.T):
+        p, q = np.clip(p, 1e-6, None), np.clip(bin_shares(edges, col), 1e-6, None)
+        out.append(float(np.sum((q - p) * np.log(q / p))))
+    return max(out)
+
+def build(x, jobs=None):
+    """Per-tree seeds are drawn before the trees are farmed out, so the forest is the same for any jobs."""
+    return IsolationForest(contamination=0.01, random_state=SEED, n_jobs=jobs).fit(x)
+
+def fit(con, sample_rows, version, stratify=None, jobs=None):
+    """IsolationForest grows each tree on 256 rows anyway, so a sample fits the same model in fixed memory."""
+    x = sample(con, EPOCH, sample_rows, stratify)
+    clf = build(x, jobs)
+    model = {"model": clf, "version": version, "trained_at": datetime.now().isoformat(timespec="seconds"),
+             "fingerprint": fingerprint(con), "features": FEATURE_NAMES, "sample_rows": len(x),
+             "stratify": stratify, "psi_reference": psi_reference(drift_sample(con, EPOCH) if stratify else x)}
+    MODEL_PATH.parent.mkdir(parents=True, exist_ok=True)
+    joblib.dump(model, MODEL_PATH)
+    return model
+
+def load_model():
+    return joblib.load(MODEL_PATH) if MODEL_PATH.exists() else None
+
+def watermark(con, lookback_days=0):
+    """Scan start for the next run: the latest scored ts minus the lookback the incremental fact re-reads, since
+    rows that arrive late inside it still reach fact_transactions. Already-scored tx_ids are skipped by score()."""
+    if not any(SCORES.glob("*.parquet")):
+        return EPOCH
+    last = con.execute(f"select max(ts) from read_parquet('{SCORES.as_posix()}/*.parquet')").fetchone()[0]
+    return last - timedelta(days=lookback_days) if last else EPOCH
+
+def fraud_score(clf, x):
+    return -clf.decision_function(x)
+
+def score(con, model, after, batch_rows, workers=1, path=None, scored=()):
+    """Stream transactions with ts > after as Arrow record batches and append their scores to one new part file,
+    skipping tx_ids already present in the scored part files."""
+    schema = pa.schema([("tx_id", pa.int64()), ("ts", pa.timestamp("us")), ("customer_id", pa.int32()),
+                        ("branch_id", pa.int32()), ("amount", pa.float64()), ("z", pa.float64()),
+                        ("fraud_score", pa.float64()), ("model_version", pa.int32())])
+    path = path or SCORES/f"part-{datetime.now():%Y%m%d%H%M%S}-v{model['version']}.parquet"
+    tmp = path.with_name(f".{path.name}.tmp")  # hidden and not *.parquet: readers of the directory skip it
+    path.parent.mkdir(parents=True, exist_ok=True)
+    sql, params = FEATURES_SQL, [after]
+    if scored:  # the ts filter lets the anti-join skip score row groups from before the lookback
+        fps = "[" + ", ".join(f"'{p.as_posix()}'" for p in scored) + "]"
+        sql += f"and t.tx_id not in (select tx_id from read_parquet({fps}) where ts > ?)\n"; params.append(after)
+    n, batches = 0, record_batches(con, sql, batch_rows, params)
+    try:
+        with pq.ParquetWriter(tmp, schema) as writer:
+            for batch, s in ordered_map(fraud_score, model["model"], batches, workers, features):
+                version = np.full(len(s), model["version"], np.int32)
+                cols = [batch[c] for c in schema.names[:-2]] + [pa.array(s), pa.array(version)]
+                writer.write_table(pa.table(cols, schema=schema))
+                n += batch.num_rows
+        if n:
+            tmp.rename(path)  # the watermark only moves once the whole part is written
+    finally:
+        tmp.unlink(missing_ok=True)
+    return n, path
+
+def update_topk(con, parts, k):
+    """Top-k of (current top-k rows + the new parts) equals the top-k over all scores, so only new rows are read.
+    Risk tiers are relative to each scope's top-k: >= its 95th percentile is Critical, >= its 80th High."""
+    con.execute("""CREATE TABLE IF NOT EXISTS main_marts.fraud_alerts_topk (
+        scope VARCHAR, scope_key VARCHAR, rank BIGINT, tx_id BIGINT, ts TIMESTAMP, customer_id INTEGER,
+        branch_id INTEGER, amount DOUBLE, fraud_score DOUBLE, model_version INTEGER, risk_tier VARCHAR);""")
+    fps = "[" + ", ".join(f"'{p.as_posix()}'" for p in parts) + "]"
+    cols = "tx_id, ts, customer_id, branch_id, amount, fraud_score, model_version"
+    con.execute(f"""CREATE OR REPLACE TABLE main_marts.fraud_alerts_topk AS
+    with c as (
+      select distinct on (tx_id) {cols} from (
+        select {cols} from main_marts.fraud_alerts_topk
+        union all select {cols} from read_parquet({fps})
+      ) order by tx_id, fraud_score desc
+    ),
+    ranked as (
+      select 'global' as scope, 'all' as scope_key, row_number() over (order by fraud_score desc, tx_id) as rank, * from c
+      union all
+      select 'day', cast(cast(ts as date) as varchar), row_number() over (partition by cast(ts as date) order by fraud_score desc, tx_id), * from c
+      union all
+      select 'branch', cast(branch_id as varchar), row_number() over (partition by branch_id order by fraud_score desc, tx_id), * from c
+      where branch_id is not null
+    ),
+    top as (
+      select *,
+        quantile_cont(fraud_score, 0.95) over (partition by scope, scope_key) as q95,
+        quantile_cont(fraud_score, 0.80) over (partition by scope, scope_key) as q80
+      from ranked where rank <= {int(k)}
+    )
+    select scope, scope_key, rank, {cols},
+      case when fraud_score >= q95 then 'Critical' when fraud_score >= q80 then 'High' else 'Medium' end as risk_tier
+    from top
+    order by scope, scope_key, rank""")  # sorted, so a (scope, scope_key) lookup is pruned by zone maps
+    return con.execute("select count(*) from main_marts.fraud_alerts_topk").fetchone()[0]
+
+def update_alert_stats(con, parts):
+    """Merge the new parts into main_marts.fraud_score_histogram, then recompute the one-row fraud_alert_stats from
+    it: the top-ALERT_SHARE threshold and the number of scores above it, without re-reading earlier parts."""
+    if not con.execute("select count(*) from duckdb_tables() where schema_name = 'main_marts' "
+                       "and table_name = 'fraud_score_histogram'").fetchone()[0]:
+        con.execute("CREATE TABLE main_marts.fraud_score_histogram (bin BIGINT, n BIGINT);")
+        parts = sorted(SCORES.glob("*.parquet"))  # first run with a histogram: seed it from every existing part
+    if parts:
+        fps = "[" + ", ".join(f"'{p.as_posix()}'" for p in parts) + "]"
+        con.execute(f"""CREATE OR REPLACE TABLE main_marts.fraud_score_histogram AS
+        select bin, sum(n)::BIGINT as n from (
+          select bin, n from main_marts.fraud_score_histogram
+          union all select floor(fraud_score * {SCORE_BINS})::BIGINT, count(*) from read_parquet({fps}) group by 1
+        ) group by 1 order by 1""")
+    con.execute(f"""CREATE OR REPLACE TABLE main_marts.fraud_alert_stats AS
+    with h as (
+      select bin, sum(n) over (order by bin desc) as above, sum(n) over () as total from main_marts.fraud_score_histogram
+    )
+    select max(total)::BIGINT as scored,
+      coalesce(min(bin) filter (where above <= {ALERT_SHARE} * total), max(bin) + 1) / {SCORE_BINS} as threshold,
+      coalesce(max(above) filter (where above <= {ALERT_SHARE} * total), 0)::BIGINT as alerts,
+      now()::TIMESTAMP as updated_at
+    from h""")
+    return con.execute("select alerts from main_marts.fraud_alert_stats").fetchone()[0]
+
+def refit_reason(con, model, after, args):
+    if args.refit:
+        return "--refit"
+    if model is None:
+        return "no persisted model"
+    age = (datetime.now() - datetime.fromisoformat(model["trained_at"])).days
+    if age >= args.refit_days:
+        return f"model is {age} days old"
+    new = drift_sample(con, after)
+    if len(new):
+        drift = psi(model["psi_reference"], new)
+        if drift > args.psi_threshold:
+            return f"drift: PSI {drift:.3f} > {args.psi_threshold}"
+    return None
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sample-rows", type=int, default=200_000, help="training sample size")
+    ap.add_argument("--batch-rows", type=int, default=500_000, help="rows per streamed scoring batch")
+    ap.add_argument("--refit", action="store_true", help="refit before scoring")
+    ap.add_argument("--refit-days", type=int, default=7, help="refit once the persisted model is this old")
+    ap.add_argument("--psi-threshold", type=float, default=0.2, help="refit when new rows drift past this PSI")
+    ap.add_argument("--lookback-days", type=int, default=dbt_var("fact_lookback_days", 3),
+                    help="days before the latest score re-scanned for late rows (default: dbt's fact_lookback_days)")
+    ap.add_argument("--rescore-all", action="store_true", help="drop existing scores and score the full history")
+    ap.add_argument("--top-k", type=int, default=50, help="alerts kept per scope in main_marts.fraud_alerts_topk")
+    ap.add_argument("--stratify", choices=sorted(STRATA), help="train on an equal quota of rows per customer or channel")
+    ap.add_argument("--jobs", type=int, help="threads building trees on a refit (default 1, -1 = all cores)")
+    ap.add_argument("--workers", type=int, default=1, help="processes scoring record batches")
+    args = ap.parse_args(argv)
+
+    con = duckdb.connect(DB_PATH); t0 = time.perf_counter()
+    parts = sorted(SCORES.glob("*.parquet"))
+    if parts and "tx_id" not in pq.read_schema(parts[0]).names:
+        print("Existing fraud scores have no tx_id key; rescoring the full history")
+        args.rescore_all = True
+    if args.rescore_all:
+        shutil.rmtree(SCORES, ignore_errors=True)
+        for t in ("fraud_alerts_topk", "fraud_score_histogram", "fraud_alert_stats"):
+            con.execute(f"DROP TABLE IF EXISTS main_marts.{t};")
+    model = load_model(); after = watermark(con, args.lookback_days)
+    reason = refit_reason(con, model, after, args)
+    if reason:
+        model = fit(con, args.sample_rows, (model["version"] + 1) if model else 1, args.stratify, args.jobs)
+        print(f"Refit model v{model['version']} on {model['sample_rows']:,} sampled rows ({reason}) -> {MODEL_PATH}")
+    n, path = score(con, model, after, args.batch_rows, args.workers, scored=sorted(SCORES.glob("*.parquet")))
+    dt = time.perf_counter() - t0
+    OUT.joinpath("fraud_run.json").write_text(json.dumps({
+        "model_version": model["version"], "fingerprint": model["fingerprint"], "refit": reason, "watermark": str(after),
+        "rows_scored": n, "seconds": round(dt, 3)}, indent=2))
+    print(f"Scored {n:,} transactions after {after} with model v{model['version']} in {dt:.2f}s "
+          f"({n/max(dt,1e-9):,.0f} rows/sec)")
+    if n:
+        print(f"Saved fraud scores -> {path}")
+        print(f"main_marts.fraud_alerts_topk: {update_topk(con, [path], args.top_k):,} alerts")
+    alerts = update_alert_stats(con, [path] if n else [])
+    print(f"main_marts.fraud_alert_stats: {alerts:,} scores in the top {ALERT_SHARE:.0%}")
+
+if __name__ == "__main__":
+    main()
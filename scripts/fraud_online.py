@@ -0,0 +1,154 @@
+"""Online fraud scoring: the persisted IsolationForest plus per-customer running amount stats, in memory.
+Usage: python scripts/fraud_online.py --port 8765   (POST {"customer_id": [...], "amount": [...]} to /score)
+"""
+import argparse, duckdb, json, joblib
+import numpy as np
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from fraud_isoforest import DB_PATH, MODEL_PATH, FEATURE_NAMES
+
+def average_path_length(n):
+    """Expected path length of an unsuccessful BST search over n points, as in sklearn's IsolationForest."""
+    n = np.asarray(n, dtype=np.float64); out = np.zeros_like(n)
+    out[n == 2] = 1.0
+    big = n > 2
+    out[big] = 2.0 * (np.log(n[big] - 1.0) + np.euler_gamma) - 2.0 * (n[big] - 1.0) / n[big]
+    return out
+
+class CompiledForest:
+    """Every tree's nodes in one flat array set. Leaves point to themselves with threshold +inf, so all samples
+    walk exactly max_depth steps and the walk vectorizes over trees and over a micro-batch."""
+    def __init__(self, clf):
+        trees = [(e.tree_, f) for e, f in zip(clf.estimators_, clf.estimators_features_)]
+        sizes = np.array([t.node_count for t, _ in trees]); base = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+        left, right, feat, thr, leaf_len, depth_max = [], [], [], [], [], 0
+        for (t, features), b in zip(trees, base):
+            is_leaf = t.children_left < 0; idx = np.arange(t.node_count)
+            depth = np.zeros(t.node_count)
+            for i in range(t.node_count):  # children always come after their parent in sklearn's node order
+                if not is_leaf[i]:
+                    depth[t.children_left[i]] = depth[t.children_right[i]] = depth[i] + 1
+            depth_max = max(depth_max, int(depth.max()))
+            left.append(np.where(is_leaf, idx, t.children_left) + b)
+            right.append(np.where(is_leaf, idx, t.children_right) + b)
+            feat.append(np.where(is_leaf, 0, np.asarray(features)[np.maximum(t.feature, 0)]))
+            thr.append(np.where(is_leaf, np.inf, t.threshold))
+            leaf_len.append(np.where(is_leaf, depth + average_path_length(t.n_node_samples), 0.0))
+        self.left, self.right = np.concatenate(left), np.concatenate(right)
+        self.feature, self.threshold, self.leaf_len = np.concatenate(feat), np.concatenate(thr), np.concatenate(leaf_len)
+        self.roots, self.depth = base, depth_max
+        self.denominator = len(trees) * float(average_path_length([clf.max_samples_])[0])
+        self.offset = clf.offset_
+
+    def score(self, x):
+        """fraud_score (= -decision_function) for a (batch, features) array."""
+        x = np.asarray(x, dtype=np.float32).astype(np.float64)  # sklearn trees compare float32 inputs
+        rows = np.arange(len(x))[:, None]; node = np.broadcast_to(self.roots, (len(x), len(self.roots)))
+        for _ in range(self.depth):
+            go_left = x[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(go_left, self.left[node], self.right[node])
+        return 2.0 ** (-self.leaf_len[node].sum(axis=1) / self.denominator) + self.offset
+
+MAX_ID_GROWTH = 2  # new customers may take ids up to this multiple of the warehouse's largest id
+
+def checked(ids, amounts, max_id=None):
+    """(int64 ids, float64 amounts) as 1-d arrays; ValueError unless ids are integers in [0, max_id], amounts are
+    finite and the two have the same length. A negative id would otherwise index another customer's stats, and a
+    huge one would size the dense arrays to it."""
+    ids, x = np.atleast_1d(ids), np.atleast_1d(np.asarray(amounts, np.float64))
+    if ids.ndim != 1 or (ids.size and (ids.dtype.kind not in "iu" or ids.min() < 0)):
+        raise ValueError("customer_id must be non-negative integers")
+    if max_id is not None and ids.size and ids.max() > max_id:
+        raise ValueError(f"customer_id {ids.max()} is above the largest accepted id {max_id}")
+    if x.shape != ids.shape:
+        raise ValueError(f"{len(ids)} customer_id(s) but {x.size} amount(s)")
+    if not np.isfinite(x).all():
+        raise ValueError("amount must be finite numbers")
+    return ids.astype(np.int64), x
+
+class CustomerStats:
+    """Running amount count / mean / M2 per customer in dense arrays indexed by customer_id <= max_id."""
+    def __init__(self, size=1024, max_id=None):
+        self.n = np.zeros(size, np.int64); self.mean = np.zeros(size); self.m2 = np.zeros(size); self.max_id = max_id
+    def _grow(self, max_id):
+        if max_id >= len(self.n):
+            size = max(max_id + 1, min(2 * len(self.n), (self.max_id or max_id) + 1))
+            new = [np.zeros(size, a.dtype) for a in (self.n, self.mean, self.m2)]  # all allocated before any is swapped
+            for a, old in zip(new, (self.n, self.mean, self.m2)):
+                a[:len(old)] = old
+            self.n, self.mean, self.m2 = new
+    def load(self, ids, n, mean, m2):
+        ids = np.asarray(ids, np.int64); self._grow(int(ids.max(initial=0)))
+        self.n[ids], self.mean[ids], self.m2[ids] = n, np.nan_to_num(mean), np.nan_to_num(m2)
+    def update(self, cid, x):
+        """Welford step for one transaction."""
+        (cid,), (x,) = checked(cid, x, self.max_id); self._grow(cid)
+        n = self.n[cid] + 1; d = x - self.mean[cid]
+        self.n[cid] = n; self.mean[cid] += d / n; self.m2[cid] += d * (x - self.mean[cid])
+    def update_batch(self, ids, x):
+        """Chan merge of a micro-batch's per-customer (n, mean, M2) into the running stats."""
+        ids, x = checked(ids, x, self.max_id); self._grow(int(ids.max(initial=0)))
+        u, inv = np.unique(ids, return_inverse=True)
+        nb = np.bincount(inv).astype(np.float64); mb = np.bincount(inv, x) / nb
+        m2b = np.bincount(inv, (x - mb[inv]) ** 2)
+        na = self.n[u]; n = na + nb; d = mb - self.mean[u]
+        self.m2[u] += m2b + d * d * na * nb / n; self.mean[u] += d * nb / n; self.n[u] = n
+    def z(self, ids, x):
+        """Same z as fraud_isoforest.FEATURES_SQL: sample std, 0 -> 1, undefined (n < 2) -> z = 0."""
+        n = self.n[ids]; std = np.sqrt(self.m2[ids] / np.maximum(n - 1, 1))
+        std = np.where(std == 0, 1.0, std)
+        return np.where(n > 1, (x - self.mean[ids]) / std, 0.0)
+
+class OnlineScorer:
+    def __init__(self, model, stats):
+        if model["features"] != FEATURE_NAMES:
+            raise ValueError(f"model v{model['version']} was trained on {model['features']}, expected {FEATURE_NAMES}")
+        self.version = model["version"]; self.forest = CompiledForest(model["model"]); self.stats = stats
+
+    @classmethod
+    def from_warehouse(cls, db_path=DB_PATH, model_path=MODEL_PATH, max_id=None):
+        """max_id defaults to MAX_ID_GROWTH x the largest customer_id in the warehouse."""
+        with duckdb.connect(db_path, read_only=True) as con:
+            w = con.execute("select customer_id, tx_cnt, amt_mean, amt_m2 from main_marts.customer_features "
+                            "where tx_cnt > 0").fetchnumpy()
+            largest = con.execute("select max(customer_id) from main_marts.dim_customer").fetchone()[0] or 0
+        stats = CustomerStats(max_id=max_id if max_id is not None else MAX_ID_GROWTH * max(largest, 1024))
+        stats.load(w["customer_id"], w["tx_cnt"], w["amt_mean"], w["amt_m2"])
+        return cls(joblib.load(model_path), stats)
+
+    def score(self, customer_id, amount):
+        """Fold one transaction into its customer's stats and return its fraud_score."""
+        ids, x = checked(customer_id, amount, self.stats.max_id); self.stats.update(ids[0], x[0])
+        return float(self.forest.score(np.column_stack([x, self.stats.z(ids, x)]))[0])
+
+    def score_batch(self, customer_ids, amounts):
+        """Micro-batch version: stats absorb the whole batch first, then every row is scored against them."""
+        ids, x = checked(customer_ids, amounts, self.stats.max_id); self.stats.update_batch(ids, x)
+        return self.forest.score(np.column_stack([x, self.stats.z(ids, x)]))
+
+def serve(scorer, port):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path != "/score":
+                self.send_error(404); return
+            try:
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                scores = scorer.score_batch(body["customer_id"], body["amount"])
+            except (ValueError, TypeError, KeyError) as e:  # bad JSON, missing keys, bad ids or lengths
+                self.send_error(400, f"{type(e).__name__}: {e}"); return
+            out = json.dumps({"model_version": scorer.version, "fraud_score": scores.tolist()}).encode()
+            self.send_response(200); self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(out))); self.end_headers(); self.wfile.write(out)
+    server = HTTPServer(("127.0.0.1", port), Handler)  # single-threaded: requests update the running stats in turn
+    print(f"Scoring with model v{scorer.version} on http://127.0.0.1:{port}/score")
+    server.serve_forever()
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--max-customer-id", type=int,
+                    help=f"largest customer_id accepted (default: {MAX_ID_GROWTH}x the warehouse's largest)")
+    args = ap.parse_args(argv)
+    serve(OnlineScorer.from_warehouse(max_id=args.max_customer_id), args.port)
+
+if __name__ == "__main__":
+    main()
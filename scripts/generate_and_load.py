@@ -0,0 +1,54 @@
+"""Generate synthetic BAW data directly into the DuckDB raw schema via Arrow.
+Usage: python scripts/generate_and_load.py --scale-factor 1 --now 2025-01-01T00:00:00
+"""
+import argparse, time
+import numpy as np
+from datetime import datetime
+from generate_data import SEED, CHUNK_CUSTOMERS, FILES, generate, scale_profile, to_arrow
+from common import peak_rss_mb
+from load_to_duckdb import DB_PATH, connect, recluster
+from raw_schema import RAW_SCHEMAS, create_table_sql
+
+class DuckDBSink:
+    """generate_data sink that hands each shard's Arrow table straight to DuckDB: no files, no text round trip.
+    DuckDB scans the registered Arrow buffers in place, so every shard is inserted without an intermediate copy."""
+    def __init__(self, con):
+        self.con = con
+    def reset(self):
+        for table in FILES:
+            self.con.execute(f"DROP TABLE IF EXISTS raw.{table};")
+            self.con.execute(create_table_sql(table))
+        # raw now comes from this process, not from files: the next file load must start from --full-refresh
+        self.con.execute("DELETE FROM raw._load_manifest WHERE table_name IN (SELECT unnest(?))", [list(FILES)])
+    def write(self, table, df, part):
+        cols = ", ".join(f"CAST({c} AS {t}) AS {c}" for c, t in RAW_SCHEMAS[table]["columns"].items())
+        self.con.register("_chunk", to_arrow(df))
+        self.con.execute(f"INSERT INTO raw.{table} BY NAME SELECT {cols} FROM _chunk;")
+        self.con.unregister("_chunk")
+    def finish(self):
+        pass
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--scale-factor", type=float, default=1)
+    ap.add_argument("--chunk-size", type=int, default=CHUNK_CUSTOMERS, help="customers per shard")
+    ap.add_argument("--seed", type=int, default=SEED)
+    ap.add_argument("--now", help="pin the generation clock (ISO timestamp) for reproducible runs")
+    ap.add_argument("--db", default=DB_PATH)
+    args = ap.parse_args(argv)
+
+    con = connect(args.db); t0 = time.perf_counter()
+    now = np.datetime64(args.now or datetime.now(), "us")
+    counts = generate(DuckDBSink(con), scale_profile(args.scale_factor), args.seed, now, args.chunk_size)
+    for table, spec in RAW_SCHEMAS.items():
+        if "cluster_by" in spec:  # every shard spans the full history, so order once at the end
+            recluster(con, table)
+    con.execute("CHECKPOINT;")
+    dt = time.perf_counter() - t0; total = sum(counts.values())
+    for table, n in counts.items():
+        print(f"raw.{table}: {n:,} rows")
+    print(f"Generated and loaded {total:,} rows in {dt:.2f}s ({total/max(dt,1e-9):,.0f} rows/sec, "
+          f"peak RSS {peak_rss_mb():,.0f} MB) into {args.db}")
+
+if __name__ == "__main__":
+    main()
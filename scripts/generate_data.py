@@ -1,152 +1,325 @@
-import numpy as np, pandas as pd, random
+import argparse, json, math, shutil, time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np, pandas as pd
+import pyarrow as pa, pyarrow.parquet as pq
 from pathlib import Path
-from faker import Faker
-from datetime import datetime, timedelta
+from datetime import datetime
+from common import peak_rss_mb
 
 BASE = Path("data"); RAW = BASE/"raw"
 RAW.mkdir(parents=True, exist_ok=True)
-np.random.seed(42); random.seed(42)
-fake = Faker("en_CA")
+SEED = 42
 
 PROVINCES = ["NS","NB","QC","ON","BC","AB","MB","SK","NL","PE","YT","NT","NU"]
 CHANNELS = ["POS","ATM","E-TRANSFER","BILL","ONLINE"]
 PRODUCTS = ["Chequing","Savings","CreditCard","Loan","Mortgage"]
+DEVICES = ["iOS","Android","Web"]
+CATEGORIES = ["Card","Online Banking","Branch","ATM","Other"]
+PRIORITIES = ["Low","Medium","High"]
+SENTIMENTS = ["neg","neu","pos"]
+# Same code space as fake.bothify("M####"): uniform over M0000..M9999, drawn by index instead of per row
+MERCHANT_POOL = [f"M{i:04d}" for i in range(10_000)]
 
+# SF1 sizes; scale_profile() derives every other scale factor from these
 N_CUSTOMERS = 3000
 N_BRANCHES = 25
+HISTORY_DAYS = {"transactions": 150, "digital_sessions": 90, "support_tickets": 150, "atm_withdrawals": 120}
+CHUNK_CUSTOMERS = 20_000  # customers per shard: generated, and written, as one unit
+CHUNK_BRANCHES = 1_000
+CUSTOMER_STREAM, BRANCH_STREAM = 0, 1
 
-def gen_customers(n=N_CUSTOMERS):
-    rows=[]; start_join = datetime.now() - timedelta(days=365*8)
-    for cid in range(1, n+1):
-        join_date = start_join + timedelta(days=int(np.random.gamma(2.0, 120)))
-        rows.append({
-            "customer_id": cid,
-            "age": int(np.random.randint(18, 85)),
-            "tenure_months": max(1, (datetime.now() - join_date).days // 30),
-            "province": random.choice(PROVINCES),
-            "risk_score": int(np.clip(np.random.normal(600, 80), 300, 850)),
-            "join_date": join_date.date().isoformat()
-        })
-    return pd.DataFrame(rows)
-
-def gen_accounts(customers: pd.DataFrame):
-    rows=[]; aid=1
-    for _, r in customers.iterrows():
-        for _ in range(np.random.choice([1,1,2,2,3], p=[0.35,0.35,0.2,0.08,0.02])):
-            rows.append({
-                "account_id": aid,
-                "customer_id": int(r.customer_id),
-                "product_type": random.choice(PRODUCTS),
-                "open_date": (datetime.fromisoformat(r.join_date) + timedelta(days=np.random.randint(0,180))).date().isoformat(),
-                "status": random.choice(["Open","Open","Open","Dormant","Closed"])
-            }); aid += 1
-    return pd.DataFrame(rows)
-
-def gen_branches(n=N_BRANCHES):
-    rows=[]
-    for bid in range(1, n+1):
-        rows.append({
-            "branch_id": bid,
-            "name": f"Branch {bid}",
-            "province": random.choice(PROVINCES),
-            "lat": float(44.6 + np.random.normal(0, 0.8)),
-            "lon": float(-63.6 + np.random.normal(0, 1.2))
-        })
-    return pd.DataFrame(rows)
-
-def gen_transactions(customers, accounts, branches, days=150):
-    rows=[]; txid=1; now = datetime.now()
-    for _, c in customers.iterrows():
-        k = np.random.poisson(90)
-        cust_accts = accounts[accounts.customer_id==c.customer_id].account_id.values
-        for _ in range(k):
-            ts = now - timedelta(days=np.random.randint(0, days), hours=np.random.randint(0,24), minutes=np.random.randint(0,60))
-            amount = round(np.random.lognormal(mean=3.2, sigma=0.8), 2)
-            branch = int(np.random.randint(1, N_BRANCHES+1))
-            rows.append({
-                "tx_id": txid,
-                "customer_id": int(c.customer_id),
-                "account_id": int(np.random.choice(cust_accts)),
-                "branch_id": branch,
-                "amount": amount,
-                "channel": random.choice(CHANNELS),
-                "merchant_code": fake.bothify(text="M####"),
-                "ts": ts.isoformat(sep=" ")
-            }); txid += 1
-    return pd.DataFrame(rows)
-
-def gen_sessions(customers, days=90):
-    rows=[]; sid=1; now = datetime.now()
-    for _, c in customers.iterrows():
-        k = np.random.poisson(20)
-        for _ in range(k):
-            start = now - timedelta(days=np.random.randint(0, days), hours=np.random.randint(0,24))
-            dur = np.random.randint(30, 1800)
-            rows.append({
-                "session_id": sid,
-                "customer_id": int(c.customer_id),
-                "device_type": random.choice(["iOS","Android","Web"]),
-                "start_ts": start.isoformat(sep=" "),
-                "duration_s": int(dur),
-                "events_count": int(np.random.randint(3, 50)),
-                "conv_flag": int(np.random.choice([0,1], p=[0.85,0.15]))
-            }); sid += 1
-    return pd.DataFrame(rows)
-
-def gen_tickets(customers, days=150):
-    rows=[]; tid=1; now = datetime.now()
-    for _, c in customers.iterrows():
-        k = np.random.choice([0,0,0,1,1,2], p=[0.4,0.3,0.15,0.1,0.04,0.01])
-        for _ in range(k):
-            created = now - timedelta(days=np.random.randint(0, days), hours=np.random.randint(0,24))
-            sla = int(np.random.choice([24, 48, 72], p=[0.6,0.3,0.1]))
-            resolved = created + timedelta(hours=np.random.randint(1, max(2, sla+12)))
-            rows.append({
-                "ticket_id": tid,
-                "customer_id": int(c.customer_id),
-                "created_ts": created.isoformat(sep=" "),
-                "category": random.choice(["Card","Online Banking","Branch","ATM","Other"]),
-                "priority": random.choice(["Low","Medium","High"]),
-                "sla_hours": sla,
-                "resolved_ts": resolved.isoformat(sep=" "),
-                "sentiment": random.choice(["neg","neu","pos"])
-            }); tid += 1
-    return pd.DataFrame(rows)
-
-def gen_atm_withdrawals(branches, days=120):
-    rows=[]; now = datetime.now().date()
-    for _, b in branches.iterrows():
-        base = np.random.randint(1500, 3500)
-        for d in range(days):
-            date = now - timedelta(days=d)
-            seasonal = 1.0 + 0.1*np.sin(2*np.pi*(d/7.0))
-            noise = np.random.normal(0, 120)
-            cash = max(0, base*seasonal + noise)
-            rows.append({
-                "branch_id": int(b.branch_id),
-                "date": date.isoformat(),
-                "cash_withdrawn": round(cash,2),
-                "withdrawals_cnt": int(max(0, np.random.normal(180, 30)))
-            })
-    return pd.DataFrame(rows)
-
-def main():
-    customers = gen_customers()
-    accounts = gen_accounts(customers)
-    branches = gen_branches()
-    tx = gen_transactions(customers, accounts, branches)
-    sessions = gen_sessions(customers)
-    tickets = gen_tickets(customers)
-    atm = gen_atm_withdrawals(branches)
-
-    (RAW/'customers.csv').write_text(customers.to_csv(index=False))
-    (RAW/'accounts.csv').write_text(accounts.to_csv(index=False))
-    (RAW/'branches.csv').write_text(branches.to_csv(index=False))
-    (RAW/'transactions.csv').write_text(tx.to_csv(index=False))
-    (RAW/'digital_sessions.csv').write_text(sessions.to_csv(index=False))
-    (RAW/'support_tickets.csv').write_text(tickets.to_csv(index=False))
-    (RAW/'atm_withdrawals.csv').write_text(atm.to_csv(index=False))
-    print("Generated raw CSVs in data/raw/")
+FILES = {
+    "customers": "customers.csv",
+    "accounts": "accounts.csv",
+    "branches": "branches.csv",
+    "transactions": "transactions.csv",
+    "digital_sessions": "digital_sessions.csv",
+    "support_tickets": "support_tickets.csv",
+    "atm_withdrawals": "atm_withdrawals.csv"
+}
+# Parquet layout: these tables land as <table>/date=YYYY-MM-DD/part-N.parquet, the rest as <table>/part-N.parquet
+PARTITION_BY = {"transactions": "ts", "digital_sessions": "start_ts", "support_tickets": "created_ts"}
+DATE_COLUMNS = {"join_date", "open_date", "date"}
+
+def pick(rng, values, n, p=None):
+    """n draws from values as a categorical (codes + one copy of each label, no per-row strings)."""
+    codes = rng.choice(len(values), n, p=p) if p is not None else rng.integers(0, len(values), n)
+    return pd.Categorical.from_codes(codes, categories=values)
+
+def gen_customers(start, n, now, rng):
+    g = rng.gamma(2.0, 120, n).astype(np.int64)
+    return pd.DataFrame({
+        "customer_id": np.arange(start, start+n, dtype=np.int64),
+        "age": rng.integers(18, 85, n),
+        "tenure_months": np.maximum(1, (365*8 - g) // 30),
+        "province": pick(rng, PROVINCES, n),
+        "risk_score": np.clip(rng.normal(600, 80, n), 300, 850).astype(np.int64),
+        "join_date": now.astype("datetime64[D]") - np.timedelta64(365*8, "D") + g.astype("timedelta64[D]")
+    })
+
+def shard_rngs(seed, stream, shard):
+    """(counts_rng, values_rng) for one shard, derived only from (seed, stream, shard) so output never depends on --workers."""
+    counts, values = np.random.SeedSequence(seed, spawn_key=(stream, shard)).spawn(2)
+    return np.random.default_rng(counts), np.random.default_rng(values)
+
+def scale_profile(sf):
+    """TPC-style sizing. SF1 is the original 3,000-customer / 25-branch warehouse; customers grow linearly with SF,
+    branches with sqrt(SF), and history length by one SF1 window per decade (SF10 = 2x, SF1000 = 4x days).
+    Per-day activity rates stay fixed, so per-customer row counts grow with the history length."""
+    h = 1 + math.log10(sf) if sf > 1 else 1.0
+    return {
+        "scale_factor": sf,
+        "customers": max(1, round(N_CUSTOMERS*sf)),
+        "branches": max(1, round(N_BRANCHES*math.sqrt(sf))),
+        "history_factor": h,
+        "days": {table: round(days*h) for table, days in HISTORY_DAYS.items()},
+        "tx_per_customer": 90*h,
+        "sessions_per_customer": 20*h,
+        "ticket_rounds": round(h)
+    }
+
+def draw_counts(rng, n, profile):
+    """Per-customer row counts of each child table. Drawn from their own stream so shard sizes (and id offsets) are cheap to precompute."""
+    return {
+        "accounts": rng.choice([1,1,2,2,3], n, p=[0.35,0.35,0.2,0.08,0.02]),
+        "transactions": rng.poisson(profile["tx_per_customer"], n),
+        "digital_sessions": rng.poisson(profile["sessions_per_customer"], n),
+        "support_tickets": rng.choice([0,0,0,1,1,2], (profile["ticket_rounds"], n), p=[0.4,0.3,0.15,0.1,0.04,0.01]).sum(axis=0)
+    }
+
+def gen_accounts(customers, k, start, rng):
+    n = int(k.sum())
+    return pd.DataFrame({
+        "account_id": np.arange(start, start+n, dtype=np.int64),
+        "customer_id": np.repeat(customers.customer_id.to_numpy(), k),
+        "product_type": pick(rng, PRODUCTS, n),
+        "open_date": np.repeat(customers.join_date.to_numpy().astype("datetime64[D]"), k)
+                     + rng.integers(0, 180, n).astype("timedelta64[D]"),
+        "status": pick(rng, ["Open","Dormant","Closed"], n, p=[0.6,0.2,0.2])
+    })
+
+def gen_branches(start, n, rng):
+    bid = np.arange(start, start+n, dtype=np.int64)
+    return pd.DataFrame({
+        "branch_id": bid,
+        "name": [f"Branch {b}" for b in bid],
+        "province": pick(rng, PROVINCES, n),
+        "lat": 44.6 + rng.normal(0, 0.8, n),
+        "lon": -63.6 + rng.normal(0, 1.2, n)
+    })
+
+def account_index(accounts: pd.DataFrame, base, span):
+    """CSR-style customer -> accounts index: ids[offsets[c-base]:offsets[c-base+1]] are customer c's accounts."""
+    a = accounts.sort_values(["customer_id","account_id"], kind="stable")
+    counts = np.bincount(a.customer_id.to_numpy(np.int64) - base, minlength=span)
+    return a.account_id.to_numpy(np.int64), np.concatenate(([0], np.cumsum(counts)))
+
+def gen_transactions(customers, accounts, k, start, now, rng, days=150, n_branches=N_BRANCHES):
+    """All transactions for a block of customers, one vectorized draw per column (no per-row Python)."""
+    cust_ids = customers.customer_id.to_numpy(np.int64); base = int(cust_ids.min()) if len(cust_ids) else 0
+    rel = cust_ids - base
+    acct_ids, acct_offsets = account_index(accounts, base, int(rel.max())+1 if len(rel) else 0)
+    lo = acct_offsets[rel]; n_accts = acct_offsets[rel+1] - lo
+    cid = np.repeat(cust_ids, k); n = len(cid)
+    pick_acct = np.repeat(lo, k) + (rng.random(n) * np.repeat(n_accts, k)).astype(np.int64)
+    minutes = rng.integers(0, days, n)*1440 + rng.integers(0, 24, n)*60 + rng.integers(0, 60, n)
+    return pd.DataFrame({
+        "tx_id": np.arange(start, start+n, dtype=np.int64),
+        "customer_id": cid,
+        "account_id": acct_ids[pick_acct],
+        "branch_id": rng.integers(1, n_branches+1, n),
+        "amount": np.round(rng.lognormal(mean=3.2, sigma=0.8, size=n), 2),
+        "channel": pick(rng, CHANNELS, n),
+        "merchant_code": pick(rng, MERCHANT_POOL, n),
+        "ts": now - minutes.astype("timedelta64[m]")
+    })
+
+def gen_sessions(customers, k, start, now, rng, days=90):
+    n = int(k.sum())
+    hours = rng.integers(0, days, n)*24 + rng.integers(0, 24, n)
+    return pd.DataFrame({
+        "session_id": np.arange(start, start+n, dtype=np.int64),
+        "customer_id": np.repeat(customers.customer_id.to_numpy(), k),
+        "device_type": pick(rng, DEVICES, n),
+        "start_ts": now - hours.astype("timedelta64[h]"),
+        "duration_s": rng.integers(30, 1800, n),
+        "events_count": rng.integers(3, 50, n),
+        "conv_flag": (rng.random(n) < 0.15).astype(np.int64)
+    })
+
+def gen_tickets(customers, k, start, now, rng, days=150):
+    n = int(k.sum())
+    created = now - (rng.integers(0, days, n)*24 + rng.integers(0, 24, n)).astype("timedelta64[h]")
+    sla = rng.choice([24, 48, 72], n, p=[0.6,0.3,0.1])
+    return pd.DataFrame({
+        "ticket_id": np.arange(start, start+n, dtype=np.int64),
+        "customer_id": np.repeat(customers.customer_id.to_numpy(), k),
+        "created_ts": created,
+        "category": pick(rng, CATEGORIES, n),
+        "priority": pick(rng, PRIORITIES, n),
+        "sla_hours": sla,
+        "resolved_ts": created + rng.integers(1, np.maximum(2, sla+12)).astype("timedelta64[h]"),
+        "sentiment": pick(rng, SENTIMENTS, n)
+    })
+
+def gen_atm_withdrawals(branches, now, rng, days=120):
+    nb = len(branches); d = np.arange(days)
+    base = rng.integers(1500, 3500, (nb, 1))
+    seasonal = 1.0 + 0.1*np.sin(2*np.pi*(d/7.0))
+    cash = np.maximum(0, base*seasonal + rng.normal(0, 120, (nb, days)))
+    return pd.DataFrame({
+        "branch_id": np.repeat(branches.branch_id.to_numpy(), days),
+        "date": np.tile(now.astype("datetime64[D]") - d.astype("timedelta64[D]"), nb),
+        "cash_withdrawn": np.round(cash, 2).ravel(),
+        "withdrawals_cnt": np.maximum(0, rng.normal(180, 30, (nb, days))).astype(np.int64).ravel()
+    })
+
+def gen_chunk(cust_start, n, now, seed, shard, ids, profile):
+    """Every customer-level table for one shard, customers [cust_start, cust_start+n); ids holds its first id per table."""
+    counts_rng, rng = shard_rngs(seed, CUSTOMER_STREAM, shard)
+    k = draw_counts(counts_rng, n, profile); days = profile["days"]
+    customers = gen_customers(cust_start, n, now, rng)
+    accounts = gen_accounts(customers, k["accounts"], ids["accounts"], rng)
+    return {
+        "customers": customers,
+        "accounts": accounts,
+        "transactions": gen_transactions(customers, accounts, k["transactions"], ids["transactions"], now, rng,
+                                         days=days["transactions"], n_branches=profile["branches"]),
+        "digital_sessions": gen_sessions(customers, k["digital_sessions"], ids["digital_sessions"], now, rng,
+                                         days=days["digital_sessions"]),
+        "support_tickets": gen_tickets(customers, k["support_tickets"], ids["support_tickets"], now, rng,
+                                       days=days["support_tickets"])
+    }
+
+def shard_sizes(task):
+    seed, shard, n, profile = task
+    return {t: int(k.sum()) for t, k in draw_counts(shard_rngs(seed, CUSTOMER_STREAM, shard)[0], n, profile).items()}
+
+def run_customer_shard(task):
+    sink, seed, shard, start, n, ids, now, profile = task
+    chunk = gen_chunk(start, n, now, seed, shard, ids, profile)
+    for table, df in chunk.items():
+        sink.write(table, df, shard)
+    return {table: len(df) for table, df in chunk.items()}
+
+def run_branch_shard(task):
+    sink, seed, shard, start, n, now, profile = task
+    rng = shard_rngs(seed, BRANCH_STREAM, shard)[1]
+    branches = gen_branches(start, n, rng); atm = gen_atm_withdrawals(branches, now, rng, days=profile["days"]["atm_withdrawals"])
+    sink.write("branches", branches, shard); sink.write("atm_withdrawals", atm, shard)
+    return {"branches": len(branches), "atm_withdrawals": len(atm)}
+
+def to_arrow(df, decode_dictionaries=False):
+    """Arrow table for a generated chunk: date columns as date32, categoricals as dictionary (or plain string) arrays."""
+    t = pa.Table.from_pandas(df, preserve_index=False)
+    for i, field in enumerate(t.schema):
+        if field.name in DATE_COLUMNS:
+            t = t.set_column(i, field.name, t[field.name].cast(pa.date32()))
+        elif decode_dictionaries and pa.types.is_dictionary(field.type):
+            t = t.set_column(i, field.name, t[field.name].cast(field.type.value_type))
+    return t
+
+class CsvSink:
+    """Shards write data/raw/.parts/<table>/part-N.csv; finish() stitches them in shard order into data/raw/<table>.csv."""
+    def __init__(self, root=RAW):
+        self.root = root; self.parts = root/".parts"
+    def reset(self):
+        shutil.rmtree(self.parts, ignore_errors=True)
+        for table in FILES:
+            shutil.rmtree(self.root/table, ignore_errors=True)  # stale Parquet layout from an earlier run
+    def write(self, table, df, part):
+        (self.parts/table).mkdir(parents=True, exist_ok=True)
+        df.to_csv(self.parts/table/f"part-{part:05d}.csv", index=False)
+    def finish(self):
+        for table, filename in FILES.items():
+            with open(self.root/filename, "wb") as out:
+                for i, fp in enumerate(sorted((self.parts/table).glob("part-*.csv"))):
+                    with open(fp, "rb") as f:
+                        if i: f.readline()  # header comes from the first part only
+                        shutil.copyfileobj(f, out)
+        shutil.rmtree(self.parts)
+
+class ParquetSink:
+    """Writes each shard as part-N.parquet files, date-partitioned for the PARTITION_BY tables."""
+    def __init__(self, root=RAW):
+        self.root = root
+    def reset(self):
+        for table, filename in FILES.items():
+            shutil.rmtree(self.root/table, ignore_errors=True); (self.root/filename).unlink(missing_ok=True)
+    def write(self, table, df, part):
+        out = self.root/table; out.mkdir(parents=True, exist_ok=True)
+        t = to_arrow(df, decode_dictionaries=True)  # let Parquet build a dictionary of the values actually used
+        col = PARTITION_BY.get(table)
+        if col is None:
+            pq.write_table(t, out/f"part-{part:05d}.parquet"); return
+        day = df[col].to_numpy().astype("datetime64[D]")
+        order = np.argsort(day, kind="stable"); days, starts = np.unique(day[order], return_index=True)
+        t = t.take(order); ends = np.append(starts[1:], len(order))
+        for d, lo, hi in zip(days, starts, ends):
+            (out/f"date={d}").mkdir(exist_ok=True)
+            pq.write_table(t.slice(lo, hi-lo), out/f"date={d}"/f"part-{part:05d}.parquet")
+    def finish(self):
+        pass
+
+def write_manifest(profile, counts, args, now):
+    """data/raw/manifest.json: what was generated and how big it is, so downstream stages can be benchmarked at known sizes."""
+    manifest = {"scale_factor": args.scale_factor, "seed": args.seed, "now": str(now), "format": args.format,
+                "chunk_size": args.chunk_size, "profile": profile, "row_counts": counts}
+    (RAW/"manifest.json").write_text(json.dumps(manifest, indent=2))
+
+def generate(sink, profile, seed=SEED, now=None, chunk_size=CHUNK_CUSTOMERS, workers=1):
+    """Generate every shard of a scale profile into sink; returns row counts per table."""
+    now = now if now is not None else np.datetime64(datetime.now(), "us")
+    n_cust, n_branch = profile["customers"], profile["branches"]
+    counts = dict.fromkeys(FILES, 0); sink.reset()
+    cust = [(shard, start, min(chunk_size, n_cust+1-start))
+            for shard, start in enumerate(range(1, n_cust+1, chunk_size))]
+    branch = [(shard, start, min(CHUNK_BRANCHES, n_branch+1-start))
+              for shard, start in enumerate(range(1, n_branch+1, CHUNK_BRANCHES))]
+    pool = ProcessPoolExecutor(workers) if workers > 1 else None
+    run = pool.map if pool else map
+    try:
+        # first ids of every shard come from the cheap count pass, so shards can then run independently
+        ids, nxt = [], dict.fromkeys(["accounts","transactions","digital_sessions","support_tickets"], 1)
+        for sizes in run(shard_sizes, [(seed, shard, n, profile) for shard, _, n in cust]):
+            ids.append(dict(nxt))
+            for table, n in sizes.items():
+                nxt[table] += n
+        tasks = [(sink, seed, shard, start, n, first, now, profile) for (shard, start, n), first in zip(cust, ids)]
+        for done in run(run_customer_shard, tasks):
+            for table, n in done.items():
+                counts[table] += n
+        for done in run(run_branch_shard, [(sink, seed, shard, start, n, now, profile) for shard, start, n in branch]):
+            for table, n in done.items():
+                counts[table] += n
+    finally:
+        if pool:
+            pool.shutdown()
+    sink.finish()
+    return counts
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Generate synthetic BAW raw data in bounded memory.")
+    ap.add_argument("--format", choices=["csv","parquet"], default="csv")
+    ap.add_argument("--scale-factor", type=float, default=1, help="SF1 = 3,000 customers / 25 branches (see scale_profile)")
+    ap.add_argument("--chunk-size", type=int, default=CHUNK_CUSTOMERS, help="customers per shard")
+    ap.add_argument("--workers", type=int, default=1, help="shard processes; output is identical for any value")
+    ap.add_argument("--seed", type=int, default=SEED)
+    ap.add_argument("--now", help="pin the generation clock (ISO timestamp) for reproducible runs")
+    args = ap.parse_args(argv)
+
+    sink = ParquetSink() if args.format == "parquet" else CsvSink()
+    now = np.datetime64(args.now or datetime.now(), "us")
+    profile = scale_profile(args.scale_factor); t0 = time.perf_counter()
+    counts = generate(sink, profile, args.seed, now, args.chunk_size, args.workers)
+    write_manifest(profile, counts, args, now)
+
+    dt = time.perf_counter() - t0; total = sum(counts.values())
+    for table, n in counts.items():
+        print(f"{table}: {n:,} rows")
+    print(f"Generated {total:,} rows in {dt:.2f}s with {args.workers} worker(s) "
+          f"({total/max(dt,1e-9):,.0f} rows/sec, peak RSS {peak_rss_mb():,.0f} MB)")
+    print(f"Generated raw {args.format} files (SF{args.scale_factor:g}) in data/raw/, row counts in data/raw/manifest.json")
 
 if __name__ == "__main__":
     main()
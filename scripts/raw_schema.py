@@ -0,0 +1,51 @@
+# Contract for the seven raw tables: column order and DuckDB types as generate_data.py writes them,
+# the columns that must be present on every row, the primary key used for upserts and uniqueness checks, and
+# optionally the column the table is physically ordered by.
+RAW_SCHEMAS = {
+    "customers": {
+        "columns": {"customer_id": "BIGINT", "age": "INTEGER", "tenure_months": "INTEGER", "province": "VARCHAR",
+                    "risk_score": "INTEGER", "join_date": "DATE"},
+        "not_null": ["customer_id"],
+        "primary_key": ["customer_id"]
+    },
+    "accounts": {
+        "columns": {"account_id": "BIGINT", "customer_id": "BIGINT", "product_type": "VARCHAR", "open_date": "DATE",
+                    "status": "VARCHAR"},
+        "not_null": ["account_id", "customer_id"],
+        "primary_key": ["account_id"]
+    },
+    "branches": {
+        "columns": {"branch_id": "INTEGER", "name": "VARCHAR", "province": "VARCHAR", "lat": "DOUBLE", "lon": "DOUBLE"},
+        "not_null": ["branch_id"],
+        "primary_key": ["branch_id"]
+    },
+    "transactions": {
+        "columns": {"tx_id": "BIGINT", "customer_id": "BIGINT", "account_id": "BIGINT", "branch_id": "INTEGER",
+                    "amount": "DOUBLE", "channel": "VARCHAR", "merchant_code": "VARCHAR", "ts": "TIMESTAMP"},
+        "not_null": ["tx_id", "customer_id", "account_id", "amount", "ts"],
+        "primary_key": ["tx_id"],
+        "cluster_by": "ts"  # rows are stored in ts order so min/max zone maps prune time-window scans
+    },
+    "digital_sessions": {
+        "columns": {"session_id": "BIGINT", "customer_id": "BIGINT", "device_type": "VARCHAR", "start_ts": "TIMESTAMP",
+                    "duration_s": "INTEGER", "events_count": "INTEGER", "conv_flag": "INTEGER"},
+        "not_null": ["session_id", "customer_id", "start_ts"],
+        "primary_key": ["session_id"]
+    },
+    "support_tickets": {
+        "columns": {"ticket_id": "BIGINT", "customer_id": "BIGINT", "created_ts": "TIMESTAMP", "category": "VARCHAR",
+                    "priority": "VARCHAR", "sla_hours": "INTEGER", "resolved_ts": "TIMESTAMP", "sentiment": "VARCHAR"},
+        "not_null": ["ticket_id", "customer_id", "created_ts"],
+        "primary_key": ["ticket_id"]
+    },
+    "atm_withdrawals": {
+        "columns": {"branch_id": "INTEGER", "date": "DATE", "cash_withdrawn": "DOUBLE", "withdrawals_cnt": "INTEGER"},
+        "not_null": ["branch_id", "date"],
+        "primary_key": ["branch_id", "date"]
+    }
+}
+
+def create_table_sql(table, schema="raw", name=None):
+    spec = RAW_SCHEMAS[table]
+    cols = ",\n    ".join(f"{c} {t}{' NOT NULL' if c in spec['not_null'] else ''}" for c, t in spec["columns"].items())
+    return f"CREATE TABLE IF NOT EXISTS {schema}.{name or table} (\n    {cols}\n);"
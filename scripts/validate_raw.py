@@ -0,0 +1,271 @@
+"""Streaming validation of the raw files before they are loaded, in a fixed memory budget; bad rows are quarantined.
+Usage: python scripts/validate_raw.py [--memory-mb 256] [--max-error-rate 0.001] [tables ...]
+"""
+import argparse, duckdb, json, math, sys, tempfile, time
+import numpy as np, pandas as pd, pyarrow.parquet as pq
+from pathlib import Path
+from data_quality import RULES
+from load_to_duckdb import files, source_files
+from raw_schema import RAW_SCHEMAS
+
+OUT = Path("data/outputs"); OUT.mkdir(parents=True, exist_ok=True)
+QUARANTINE = Path("data/quarantine")
+BYTES_PER_VALUE = 80  # rough in-memory size of one parsed pandas cell, object strings included
+MIN_BLOOM_HASHES = 2  # below this the filter passes ~half of all keys on as duplicate candidates
+CHUNK_SHARE, BLOOM_SHARE, SPILL_SHARE = 0.4, 0.4, 0.2  # --memory-mb split: parse chunks, Bloom filter, DuckDB spill
+
+class ThresholdExceeded(Exception):
+    pass
+
+def splitmix64(x):
+    x = (x + np.uint64(0x9E3779B97F4A7C15)) & np.uint64(0xFFFFFFFFFFFFFFFF)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+class BloomFilter:
+    """Bit-array Bloom filter over uint64 key hashes with k probes by double hashing (Kirsch-Mitzenmacher)."""
+    def __init__(self, n_keys, n_bytes):
+        self.m = max(64, n_bytes * 8)
+        self.k = max(1, min(16, round(self.m / max(n_keys, 1) * math.log(2))))
+        self.bits = np.zeros(self.m // 8 + 1, dtype=np.uint8)
+    def fp_rate(self, n_keys):
+        return (1 - math.exp(-self.k * n_keys / self.m)) ** self.k
+    def add(self, h):
+        """Insert hashes; returns the mask of those that were (probably) already present before this call."""
+        h2 = splitmix64(h) | np.uint64(1); seen = np.ones(len(h), dtype=bool)
+        with np.errstate(over="ignore"):
+            probes = [((h + np.uint64(i) * h2) % np.uint64(self.m)).astype(np.int64) for i in range(self.k)]
+        for p in probes:
+            seen &= (self.bits[p >> 3] >> (p & 7).astype(np.uint8)) & 1 == 1
+        for p in probes:
+            np.bitwise_or.at(self.bits, p >> 3, (1 << (p & 7)).astype(np.uint8))
+        return seen
+
+def parse(values, sql_type):
+    """(typed values, mask of non-empty values that don't parse) for one column of CSV strings."""
+    present = values.notna()
+    if sql_type in ("BIGINT", "INTEGER"):
+        v = pd.to_numeric(values, errors="coerce"); bad = present & (v.isna() | (v % 1 != 0))
+        return v.where(~bad).astype("Int64"), bad
+    if sql_type == "DOUBLE":
+        v = pd.to_numeric(values, errors="coerce"); return v, present & v.isna()
+    if sql_type in ("DATE", "TIMESTAMP"):
+        v = pd.to_datetime(values, errors="coerce", format="ISO8601"); return v, present & v.isna()
+    return values, pd.Series(False, index=values.index)
+
+def schema_errors(table, path):
+    """Header / Parquet schema problems for one file; any of them rejects the whole file."""
+    cols = list(RAW_SCHEMAS[table]["columns"])
+    if path.suffix == ".parquet":
+        got = pq.read_schema(path).names
+    else:
+        got = pd.read_csv(path, nrows=0).columns.tolist()
+    missing = [c for c in cols if c not in got]; extra = [c for c in got if c not in cols]
+    return ([f"missing columns {missing}"] if missing else []) + ([f"unexpected columns {extra}"] if extra else [])
+
+def read_chunks(path, table, chunk_rows):
+    """Yield (first line number, DataFrame) chunks; CSV values stay strings so bad ones can be reported verbatim."""
+    cols = list(RAW_SCHEMAS[table]["columns"])
+    if path.suffix == ".parquet":
+        line = 0
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows, columns=cols):
+            df = batch.to_pandas()
+            yield line, df
+            line += len(df)
+    else:
+        reader = pd.read_csv(path, dtype=str, keep_default_na=False, na_values=[""], chunksize=chunk_rows, usecols=cols)
+        line = 2  # 1-based, after the header
+        for df in reader:
+            yield line, df
+            line += len(df)
+
+def check_chunk(table, df):
+    """(typed chunk, reason per row or None) for type, NOT NULL and range checks."""
+    spec = RAW_SCHEMAS[table]; reasons = pd.Series(None, index=df.index, dtype=object)
+    typed = {}
+    for c, t in spec["columns"].items():
+        if df[c].dtype == object:
+            typed[c], bad = parse(df[c], t)
+            reasons = reasons.mask(bad & reasons.isna(), f"{c}: not a valid {t}")
+        else:
+            typed[c] = df[c]
+    typed = pd.DataFrame(typed)
+    for c in spec["not_null"]:
+        reasons = reasons.mask(typed[c].isna() & reasons.isna(), f"{c}: null")
+    for r in RULES.get(table, []):
+        if r["check"] not in ("positive", "range"):
+            continue
+        v = typed[r["column"]]; bad = pd.Series(False, index=df.index)
+        if r["check"] == "positive":
+            bad |= v <= 0
+        if "min" in r:
+            bad |= v < r["min"]
+        if "max" in r:
+            bad |= v > r["max"]
+        reasons = reasons.mask(bad.fillna(False).astype(bool) & reasons.isna(), f"{r['column']}: {r['check']} check failed")
+    return typed, reasons
+
+def key_frame(typed, table):
+    """Primary-key columns normalised so CSV (nullable Int64, parsed datetimes) and Parquet (int32/int64, date
+    objects) input compare and hash alike."""
+    k = typed[RAW_SCHEMAS[table]["primary_key"]].copy()
+    for c, t in RAW_SCHEMAS[table]["columns"].items():
+        if c in k and t in ("DATE", "TIMESTAMP"):
+            k[c] = pd.to_datetime(k[c])
+        elif c in k and pd.api.types.is_integer_dtype(k[c]):
+            k[c] = k[c].astype("int64")
+    return k.reset_index(drop=True)
+
+def key_hashes(keys):
+    return pd.util.hash_pandas_object(keys, index=False).to_numpy(np.uint64)
+
+class KeySpill:
+    """Duplicate-key candidates and, on the confirming pass, the candidate keys seen so far, kept in an on-disk DuckDB
+    database under a memory limit, so neither set has to fit in the budget. Keys are compared on their real values."""
+    def __init__(self, directory, keys, memory_mb):
+        self.keys = ", ".join(keys); self.con = duckdb.connect(f"{directory}/keys.duckdb")
+        self.con.execute(f"SET memory_limit = '{max(memory_mb, 16)}MB'; SET temp_directory = '{directory}';"
+                         "SET preserve_insertion_order = false;")
+        self.created = False
+    def add_candidates(self, keys):
+        self.con.register("_keys", keys)
+        if not self.created:
+            self.con.execute("CREATE TABLE candidates AS SELECT * FROM _keys WHERE false;"
+                             "CREATE TABLE seen AS SELECT * FROM _keys WHERE false;")
+            self.created = True
+        self.con.execute("INSERT INTO candidates SELECT DISTINCT * FROM _keys;"); self.con.unregister("_keys")
+    def finish_candidates(self):
+        if not self.created:
+            return 0
+        self.con.execute("CREATE OR REPLACE TABLE candidates AS SELECT DISTINCT * FROM candidates;")
+        return self.con.execute("SELECT count(*) FROM candidates").fetchone()[0]
+    def duplicates(self, keys):
+        """Positions in keys whose key was already seen, earlier in this chunk or in an earlier one."""
+        self.con.register("_keys", keys.assign(_pos=np.arange(len(keys))))
+        self.con.execute(f"""CREATE OR REPLACE TEMP TABLE _match AS
+            SELECT *, row_number() OVER (PARTITION BY {self.keys} ORDER BY _pos) AS _rn
+            FROM _keys SEMI JOIN candidates USING ({self.keys})""")
+        dup = self.con.execute(f"""SELECT m._pos FROM _match m LEFT JOIN (SELECT *, true AS _seen FROM seen) s
+            USING ({self.keys}) WHERE m._rn > 1 OR s._seen""").fetchnumpy()["_pos"]
+        self.con.execute(f"INSERT INTO seen SELECT {self.keys} FROM _match WHERE _rn = 1 "
+                         f"EXCEPT SELECT {self.keys} FROM seen")
+        self.con.unregister("_keys")
+        return np.sort(dup)
+    def close(self):
+        self.con.close()
+
+class Quarantine:
+    def __init__(self, table):
+        self.path = QUARANTINE/f"{table}.csv"; self.rows = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True); self.path.unlink(missing_ok=True)
+    def write(self, path, first_line, df, reasons):
+        bad = reasons.notna().to_numpy()
+        if not bad.any():
+            return
+        q = df[bad].copy()
+        q.insert(0, "reason", reasons[bad].to_numpy())
+        q.insert(0, "line", first_line + np.flatnonzero(bad))
+        q.insert(0, "file", path.as_posix())
+        q.to_csv(self.path, mode="a", header=self.rows == 0, index=False); self.rows += len(q)
+
+def estimate_rows(paths):
+    """Exact for Parquet (footer metadata); for CSV, file size over the mean line length of the first 1 MB."""
+    n = 0
+    for p in paths:
+        if p.suffix == ".parquet":
+            n += pq.ParquetFile(p).metadata.num_rows
+        else:
+            with open(p, "rb") as f:
+                head = f.read(1 << 20)
+            n += int(p.stat().st_size / max(len(head) / max(head.count(b"\n"), 1), 1))
+    return n
+
+def validate_table(table, memory_mb, max_errors, max_error_rate, chunk_rows=None):
+    paths = source_files(table); spec = RAW_SCHEMAS[table]
+    stats = dict(table=table, files=len(paths), rows=0, quarantined=0, duplicate_keys=0, passes=1)
+    if not paths:
+        return stats
+    budget = memory_mb << 20
+    chunk_rows = chunk_rows or max(1_000, int(budget * CHUNK_SHARE) // (BYTES_PER_VALUE * len(spec["columns"])))
+    n_est = estimate_rows(paths)
+    # ~30 bits per key gives a ~1e-6 false-positive rate; never more than the Bloom share of the budget
+    bloom = BloomFilter(n_est, min(int(budget * BLOOM_SHARE), n_est * 30 // 8 + 1)); quarantine = Quarantine(table)
+    stats.update(chunk_rows=chunk_rows, estimated_rows=n_est, bloom_bytes=len(bloom.bits), bloom_hashes=bloom.k,
+                 bloom_fp_rate=bloom.fp_rate(n_est))
+    if bloom.k < MIN_BLOOM_HASHES:
+        need = math.ceil(n_est * 3 / 8 / BLOOM_SHARE / (1 << 20))  # ~3 bits per key in the Bloom share gives k = 2
+        print(f"Warning: raw.{table}: --memory-mb {memory_mb} leaves {bloom.m / max(n_est, 1):.1f} Bloom bits per key "
+              f"(k = {bloom.k}, ~{bloom.fp_rate(n_est):.0%} false positives); most keys will be spilled as duplicate "
+              f"candidates and re-checked. Use --memory-mb {need} or more.", file=sys.stderr)
+
+    def over_threshold():
+        errs = stats["quarantined"]
+        return errs > max_errors or errs > max_error_rate * stats["rows"]
+
+    for path in paths:  # a file whose columns don't match can't be loaded at all: fail before reading any rows
+        errs = schema_errors(table, path)
+        if errs:
+            raise ThresholdExceeded(f"raw.{table}: {path}: {'; '.join(errs)}")
+    with tempfile.TemporaryDirectory() as d:
+        spill = KeySpill(d, spec["primary_key"], int(memory_mb * SPILL_SHARE))
+        try:
+            for path in paths:
+                for first, df in read_chunks(path, table, chunk_rows):
+                    typed, reasons = check_chunk(table, df); ok = reasons.isna().to_numpy()
+                    keys = key_frame(typed[ok], table); h = key_hashes(keys)
+                    _, first_idx, counts = np.unique(h, return_index=True, return_counts=True)
+                    maybe = bloom.add(h)  # seen in an earlier chunk, or a repeat inside this one
+                    maybe[first_idx[counts > 1]] = True
+                    if maybe.any():
+                        spill.add_candidates(keys[maybe])
+                    quarantine.write(path, first, df, reasons)
+                    stats["rows"] += len(df); stats["quarantined"] = quarantine.rows
+                    if over_threshold():
+                        raise ThresholdExceeded(f"raw.{table}: {quarantine.rows:,} bad rows in the first {stats['rows']:,}")
+
+            stats["key_candidates"] = spill.finish_candidates()
+            if stats["key_candidates"]:  # exact pass on the key values: keep each key's first row, quarantine the rest
+                stats["passes"] = 2
+                for path in paths:
+                    for first, df in read_chunks(path, table, chunk_rows):
+                        typed, reasons = check_chunk(table, df); ok = np.flatnonzero(reasons.isna().to_numpy())
+                        dup = pd.Series(None, index=df.index, dtype=object)
+                        dup.iloc[ok[spill.duplicates(key_frame(typed.iloc[ok], table))]] = "duplicate primary key"
+                        quarantine.write(path, first, df, dup)
+                        stats["duplicate_keys"] += int(dup.notna().sum())
+                stats["quarantined"] = quarantine.rows
+                if over_threshold():
+                    raise ThresholdExceeded(f"raw.{table}: {stats['duplicate_keys']:,} duplicate keys")
+        finally:
+            spill.close()
+    return stats
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--memory-mb", type=int, default=256,
+                    help="budget split 40/40/20 between parse chunks, the Bloom filter and the on-disk duplicate check")
+    ap.add_argument("--chunk-rows", type=int, help="override the chunk size derived from --memory-mb")
+    ap.add_argument("--max-errors", type=int, default=10_000, help="fail once a table has more bad rows than this")
+    ap.add_argument("--max-error-rate", type=float, default=0.001, help="fail once a table's bad-row share exceeds this")
+    ap.add_argument("tables", nargs="*", default=list(files))
+    args = ap.parse_args(argv)
+
+    report, failed = [], None
+    for table in args.tables:
+        t0 = time.perf_counter()
+        try:
+            s = validate_table(table, args.memory_mb, args.max_errors, args.max_error_rate, args.chunk_rows)
+        except ThresholdExceeded as e:
+            failed = str(e); report.append({"table": table, "failed": failed}); break
+        s["seconds"] = round(time.perf_counter() - t0, 3); report.append(s)
+        print(f"raw.{table}: {s['rows']:,} rows in {s['files']} files, {s['quarantined']:,} quarantined "
+              f"({s['duplicate_keys']:,} duplicate keys), "
+              f"{s['passes']} pass(es), {s['rows']/max(s['seconds'],1e-9):,.0f} rows/sec")
+    OUT.joinpath("raw_validation.json").write_text(json.dumps(report, indent=2, default=float))
+    if failed:
+        print(f"Validation failed: {failed}; see {QUARANTINE}/", file=sys.stderr); sys.exit(1)
+    print("Saved validation report -> data/outputs/raw_validation.json")
+
+if __name__ == "__main__":
+    main()
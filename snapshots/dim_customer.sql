@@ -4,8 +4,23 @@
     target_schema='snapshots',
     unique_key='customer_id',
     strategy='check',
-    check_cols=['age','tenure_months','risk_score','province']
+    check_cols=['row_hash']
   )
 }}
-select * from {{ source('raw','customers') }}
+-- row_hash fingerprints the tracked columns so the snapshot compares one value per customer instead of four.
+-- Once the snapshot exists, only new customers and customers whose hash moved are handed to dbt's merge.
+{% set existing = load_relation(this) %}
+{% set has_hash = existing is not none and 'row_hash' in adapter.get_columns_in_relation(existing) | map(attribute='name') | list %}
+with src as (
+  select *,
+    md5(concat_ws('|', coalesce(cast(age as varchar), '~'), coalesce(cast(tenure_months as varchar), '~'),
+                       coalesce(cast(risk_score as varchar), '~'), coalesce(province, '~'))) as row_hash
+  from {{ ref('stg_customers') }}
+)
+select src.*
+from src
+{% if has_hash %}
+left join {{ this }} cur on cur.customer_id = src.customer_id and cur.dbt_valid_to is null
+where cur.row_hash is distinct from src.row_hash
+{% endif %}
 {% endsnapshot %}
@@ -0,0 +1,24 @@
+import duckdb, pytest, sys
+from pathlib import Path
+
+# scripts/ is a flat directory of entry points that import each other as siblings
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]/"scripts"))
+
+
+@pytest.fixture
+def churn_db(tmp_path, monkeypatch):
+    """A file warehouse with agg_customer_daily and dim_customer: 40 customers, customer c active every
+    (c % 5 + 1)th day from 2025-01-01 through 2025-06-30. Feature caches go under tmp_path."""
+    import churn_features
+    monkeypatch.setattr(churn_features, "CACHE", tmp_path/"churn_features")
+    path = (tmp_path/"churn.duckdb").as_posix()
+    with duckdb.connect(path) as con:
+        con.execute("CREATE SCHEMA main_marts")
+        con.execute("""CREATE TABLE main_marts.agg_customer_daily AS
+            SELECT c AS customer_id, d::DATE AS d, (1 + c % 3)::BIGINT AS tx_cnt
+            FROM range(40) t(c), range(DATE '2025-01-01', DATE '2025-07-01', INTERVAL 1 DAY) r(d)
+            WHERE datediff('day', DATE '2025-01-01', d) % (c % 5 + 1) = 0""")
+        con.execute("""CREATE TABLE main_marts.dim_customer AS
+            SELECT c AS customer_id, 20 + c AS age, c % 12 AS tenure_months, c / 40.0 AS risk_score
+            FROM range(40) t(c)""")
+    return path
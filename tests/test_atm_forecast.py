@@ -0,0 +1,33 @@
+import numpy as np, pandas as pd, pytest
+from atm_forecast import SEASON, holt_winters, run_fast, seasonal_naive
+
+
+def holt_winters_one(y, alpha, beta, gamma, steps, m=SEASON):
+    """Scalar additive Holt-Winters, one day at a time, initialised like the vectorized version."""
+    level = y[:m].mean(); trend = (y[m:2 * m].mean() - level) / m; season = list(y[:m] - level)
+    for t in range(m, len(y)):
+        s = season[t % m]; new_level = alpha * (y[t] - s) + (1 - alpha) * (level + trend)
+        trend = beta * (new_level - level) + (1 - beta) * trend
+        season[t % m] = gamma * (y[t] - new_level) + (1 - gamma) * s; level = new_level
+    return np.array([level + h * trend + season[(len(y) + h - 1) % m] for h in range(1, steps + 1)])
+
+@pytest.mark.parametrize("days", [30, 35, 61])
+def test_seasonal_forecasts_continue_the_weekly_pattern(days):
+    week = np.array([[10.0, 20, 30, 40, 50, 60, 70], [5, 1, 1, 1, 1, 1, 9]])
+    full = np.tile(week, (1, 20))
+    for fc in (seasonal_naive(full[:, :days], 10), holt_winters(full[:, :days], 10)[0]):
+        np.testing.assert_allclose(fc, full[:, days:days + 10], atol=1e-9)
+
+def test_holt_winters_matches_a_scalar_reference():
+    rng = np.random.default_rng(0); T = 75
+    Y = 100 + 0.5 * np.arange(T) + 15 * np.sin(2 * np.pi * np.arange(T) / SEASON) + rng.normal(0, 3, (4, T))
+    fc, params, _ = holt_winters(Y, 7)
+    for y, f, (a, b, g) in zip(Y, fc, params):
+        np.testing.assert_allclose(f, holt_winters_one(y, a, b, g, 7), rtol=1e-12)
+
+def test_run_fast_dates_start_after_the_last_day():
+    df = pd.DataFrame({"branch_id": np.repeat([3, 7], 21), "d": np.tile(pd.date_range("2025-01-01", periods=21), 2),
+                       "cash_withdrawn": np.arange(42.0)})
+    out, _ = run_fast(df, "seasonal_naive")
+    assert out["date"].min() == pd.Timestamp("2025-01-22") and out["branch_id"].tolist() == [3] * 7 + [7] * 7
+    np.testing.assert_array_equal(out["cash_forecast"], np.r_[np.arange(14.0, 21), np.arange(35.0, 42)])
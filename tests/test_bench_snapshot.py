@@ -0,0 +1,16 @@
+import os, pytest
+from bench_snapshot import warehouse_path
+
+def test_warehouse_path_restores_the_callers_value(monkeypatch):
+    monkeypatch.setenv("BAW_DB_PATH", "mine.duckdb")
+    with pytest.raises(RuntimeError):
+        with warehouse_path("bench.duckdb"):
+            assert os.environ["BAW_DB_PATH"] == "bench.duckdb"
+            raise RuntimeError("dbt failed")
+    assert os.environ["BAW_DB_PATH"] == "mine.duckdb"
+
+def test_warehouse_path_unsets_when_the_caller_had_none(monkeypatch):
+    monkeypatch.delenv("BAW_DB_PATH", raising=False)
+    with warehouse_path("bench.duckdb"):
+        pass
+    assert "BAW_DB_PATH" not in os.environ
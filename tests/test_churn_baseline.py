@@ -0,0 +1,23 @@
+import pytest
+import churn_baseline
+
+
+@pytest.fixture
+def run(churn_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(churn_baseline, "DB_PATH", churn_db)
+    monkeypatch.setattr(churn_baseline, "MODEL_PATH", tmp_path/"churn_logreg.joblib")
+    monkeypatch.setattr(churn_baseline, "PREDICTIONS", tmp_path/"churn_predictions")
+    return lambda *argv: churn_baseline.main(list(argv))
+
+def test_auto_reuses_the_model_without_building_the_training_frame(run, monkeypatch, capsys):
+    run("--as-of", "2025-04-30", "2025-05-31", "--mode", "train")
+    assert "Trained model v1" in capsys.readouterr().out
+    monkeypatch.setattr(churn_baseline, "build", lambda *a, **k: pytest.fail("built the training frame"))
+    run("--as-of", "2025-04-30", "2025-05-31")
+    out = capsys.readouterr().out
+    assert "Reusing model v1" in out and "Scored 40 customers as of 2025-05-31" in out
+
+def test_default_as_of_comes_from_the_data(run, capsys):
+    run(); run()
+    out = capsys.readouterr().out
+    assert "Reusing model v1" in out and "as of 2025-06-26" in out
@@ -0,0 +1,51 @@
+import duckdb, pandas as pd, pytest
+from datetime import date
+from churn_features import FEATURES, PIT_SQL, build, cache_path, default_as_of, fingerprint
+
+
+@pytest.fixture
+def con(churn_db):
+    with duckdb.connect(churn_db) as con:
+        yield con
+
+def test_only_dates_outside_the_lookback_are_cached(con):
+    build(con, ["2025-06-20", "2025-06-28"], lookback_days=3)
+    assert cache_path(date(2025, 6, 20)).exists() and not cache_path(date(2025, 6, 28)).exists()
+
+def test_cached_windows_pick_up_current_attributes(con):
+    first = build(con, ["2025-05-31"], lookback_days=3)
+    con.execute("UPDATE main_marts.dim_customer SET risk_score = risk_score + 1")
+    again = build(con, ["2025-05-31"], lookback_days=3)
+    assert cache_path(date(2025, 5, 31)).exists()
+    pd.testing.assert_series_equal(again["risk_score"], first["risk_score"] + 1)
+    pd.testing.assert_frame_equal(again.drop(columns="risk_score"), first.drop(columns="risk_score"))
+
+def test_build_matches_the_scoring_query(con):
+    build(con, ["2025-04-30"], lookback_days=3)
+    df = build(con, ["2025-04-30", "2025-06-30"], lookback_days=3)  # one date cached, one computed
+    pit = con.execute(PIT_SQL, [[date(2025, 4, 30), date(2025, 6, 30)]]).fetch_df()
+    pit["as_of"] = pd.to_datetime(pit["as_of"]).dt.date
+    pd.testing.assert_frame_equal(df[["as_of", "customer_id"] + FEATURES], pit, check_dtype=False)
+
+def test_fingerprint_tracks_the_training_inputs(con):
+    dates = ["2025-04-30", "2025-05-31"]; fp = fingerprint(con, dates)
+    assert fingerprint(con, dates[::-1]) == fp and fingerprint(con, dates[:1]) != fp
+    con.execute("INSERT INTO main_marts.agg_customer_daily VALUES (1, DATE '2025-06-15', 1)")
+    assert fingerprint(con, dates) == fp  # after the latest as-of date
+    con.execute("INSERT INTO main_marts.agg_customer_daily VALUES (1, DATE '2025-05-15', 1)")
+    assert fingerprint(con, dates) != fp
+    fp = fingerprint(con, dates)
+    con.execute("UPDATE main_marts.dim_customer SET age = age + 1 WHERE customer_id = 7")
+    assert fingerprint(con, dates) != fp
+
+def test_default_as_of_is_the_latest_final_day(con):
+    assert default_as_of(con, lookback_days=3) == date(2025, 6, 26)
+
+def test_cached_windows_are_recomputed_when_the_rollup_changes(con):
+    first = build(con, ["2025-05-31"], lookback_days=3)
+    assert cache_path(date(2025, 5, 31)).exists()
+    con.execute("UPDATE main_marts.agg_customer_daily SET tx_cnt = tx_cnt * 5 WHERE d >= DATE '2025-04-01'")
+    again = build(con, ["2025-05-31"], lookback_days=3)
+    pd.testing.assert_series_equal(again["tx_last_30"], first["tx_last_30"] * 5)
+    con.execute("UPDATE main_marts.agg_customer_daily SET tx_cnt = 1 WHERE d > DATE '2025-06-01'")  # after as-of
+    assert build(con, ["2025-05-31"], lookback_days=3)["tx_last_30"].equals(again["tx_last_30"])
@@ -0,0 +1,19 @@
+import duckdb, numpy as np, pytest
+from common import ordered_map, record_batches
+
+
+def scaled(k, x):
+    return k * x
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_ordered_map_keeps_input_order(workers):
+    items = [np.arange(i, i + 5) for i in range(20)]
+    out = list(ordered_map(scaled, 2, iter(items), workers, payload=lambda a: a[::-1]))
+    assert [i is a for (i, _), a in zip(out, items)] == [True] * 20
+    for a, s in out:
+        np.testing.assert_array_equal(s, 2 * a[::-1])
+
+def test_record_batches_stream_the_whole_result():
+    con = duckdb.connect()
+    batches = list(record_batches(con, "select range as i from range(?)", 1000, [2500]))
+    assert sum(b.num_rows for b in batches) == 2500 and max(b.num_rows for b in batches) <= 1000
@@ -0,0 +1,30 @@
+import duckdb, jinja2, numpy as np, pandas as pd
+from pathlib import Path
+
+MODELS = Path(__file__).resolve().parents[1]/"models"/"marts"
+
+
+def render(model):
+    """A model's SQL as a full (non-incremental) build, with ref() and source() pointing at plain tables."""
+    return jinja2.Template(next(MODELS.rglob(f"{model}.sql")).read_text()).render(
+        config=lambda **_: "", ref=lambda name: name, source=lambda _, name: name, is_incremental=lambda: False)
+
+def test_daily_moments_merge_to_the_per_customer_moments():
+    rng = np.random.default_rng(0); n = 5000  # amounts far from 0, where a naive sum of squares loses precision
+    tx = pd.DataFrame({"customer_id": rng.integers(0, 30, n).astype(np.int32), "amount": rng.gamma(2.0, 80.0, n) + 1e6,
+                       "channel": rng.choice(["POS", "ATM", "ONLINE"], n),
+                       "ts": np.datetime64("2025-01-01") + rng.integers(0, 60 * 86400, n).astype("timedelta64[s]")})
+    con = duckdb.connect()
+    con.execute("CREATE TABLE fact_transactions AS SELECT * FROM tx")
+    con.execute("CREATE TABLE dim_customer AS SELECT range::INTEGER AS customer_id, 30 AS age, 12 AS tenure_months, "
+                "0.5 AS risk_score FROM range(31)")
+    con.execute("CREATE TABLE fact_sessions (customer_id INTEGER, start_ts TIMESTAMP, duration_s DOUBLE, "
+                "events_count INTEGER, conv_flag INTEGER)")
+    con.execute("CREATE TABLE support_tickets (customer_id VARCHAR, created_ts VARCHAR, priority VARCHAR, sentiment VARCHAR)")
+    con.execute(f"CREATE TABLE agg_customer_daily AS {render('agg_customer_daily')}")
+    got = con.execute(f"SELECT customer_id, tx_cnt, amt_mean, amt_std FROM ({render('customer_features')}) ORDER BY 1").fetchall()
+    want = con.execute("SELECT c.range, count(amount), avg(amount), stddev_samp(amount) FROM range(31) c "
+                       "LEFT JOIN fact_transactions t ON t.customer_id = c.range GROUP BY 1 ORDER BY 1").fetchall()
+    assert [r[:2] for r in got] == [r[:2] for r in want]
+    assert got[-1][2:] == (None, None)  # customer 30 has no transactions
+    np.testing.assert_allclose([r[2:] for r in got[:-1]], [r[2:] for r in want[:-1]], rtol=1e-9)
@@ -0,0 +1,79 @@
+import duckdb, numpy as np, pytest
+from datetime import timedelta
+import fraud_isoforest
+from fraud_isoforest import build, score, watermark
+
+
+@pytest.fixture
+def con(tmp_path, monkeypatch):
+    monkeypatch.setattr(fraud_isoforest, "SCORES", tmp_path/"fraud_scores")
+    con = duckdb.connect()  # half the rows belong to one heavy customer with large amounts
+    con.execute("CREATE SCHEMA main_marts")
+    con.execute("""CREATE TABLE main_marts.fact_transactions AS
+        SELECT i::BIGINT AS tx_id, (if(i > 1000, 0, i % 50))::INTEGER AS customer_id, (i % 5)::INTEGER AS branch_id,
+          ['POS', 'ATM', 'ONLINE'][1 + i % 3] AS channel, (if(i > 1000, 500 + i % 13, 10 + i % 97))::DOUBLE AS amount,
+          TIMESTAMP '2025-01-01' + INTERVAL (i) MINUTE AS ts
+        FROM range(1, 2001) r(i)""")
+    con.execute("""CREATE TABLE main_marts.customer_features AS
+        SELECT customer_id, avg(amount) AS amt_mean, stddev_samp(amount) AS amt_std
+        FROM main_marts.fact_transactions GROUP BY 1""")
+    return con
+
+def run(con, model, lookback_days):
+    after = watermark(con, lookback_days)
+    return score(con, model, after, 500, scored=sorted(fraud_isoforest.SCORES.glob("*.parquet")),
+                 path=fraud_isoforest.SCORES/f"part-{len(list(fraud_isoforest.SCORES.glob('*.parquet')))}.parquet")[0]
+
+def test_late_rows_inside_the_lookback_are_scored_once(con):
+    x = con.execute("select amount, 0.0 from main_marts.fact_transactions").fetchnumpy()
+    model = {"model": build(np.column_stack([x["amount"], np.zeros(len(x["amount"]))])), "version": 1}
+    assert run(con, model, 3) == 2000
+    last = con.execute("select max(ts) from main_marts.fact_transactions").fetchone()[0]
+    con.execute("INSERT INTO main_marts.fact_transactions VALUES (9001, 1, 1, 'POS', 50.0, ?), (9002, 2, 1, 'POS', 60.0, ?)",
+                [last - timedelta(days=2), last - timedelta(days=5)])
+    assert run(con, model, 3) == 1  # 9001 is inside the 3-day lookback, 9002 is older
+    assert run(con, model, 3) == 0
+    n, distinct = con.execute(f"select count(*), count(distinct tx_id) from "
+                              f"read_parquet('{fraud_isoforest.SCORES.as_posix()}/*.parquet')").fetchone()
+    assert n == distinct == 2001
+
+@pytest.mark.parametrize("rows", [20, 1000, 5000])
+def test_stratified_sample_never_exceeds_rows(con, rows):
+    x = fraud_isoforest.sample(con, fraud_isoforest.EPOCH, rows, "customer")
+    assert 0 < len(x) <= rows
+
+def test_stratified_fit_does_not_report_drift_on_unchanged_data(con, tmp_path, monkeypatch):
+    monkeypatch.setattr(fraud_isoforest, "MODEL_PATH", tmp_path/"model.joblib")
+    model = fraud_isoforest.fit(con, 100, 1, stratify="customer")
+    args = type("Args", (), {"refit": False, "refit_days": 7, "psi_threshold": 0.2})
+    assert fraud_isoforest.refit_reason(con, model, fraud_isoforest.EPOCH, args) is None
+
+def test_a_failed_run_leaves_no_partial_part(con, monkeypatch):
+    x = con.execute("select amount, 0.0 from main_marts.fact_transactions").fetchnumpy()
+    model = {"model": build(np.column_stack([x["amount"], np.zeros(len(x["amount"]))])), "version": 1}
+    def boom(clf, x):
+        raise RuntimeError("scoring failed")
+    monkeypatch.setattr(fraud_isoforest, "fraud_score", boom)
+    with pytest.raises(RuntimeError):
+        run(con, model, 3)
+    assert list(fraud_isoforest.SCORES.iterdir()) == []
+
+def test_alert_stats_merge_each_new_part(con):
+    x = con.execute("select amount, 0.0 from main_marts.fact_transactions").fetchnumpy()
+    model = {"model": build(np.column_stack([x["amount"], np.zeros(len(x["amount"]))])), "version": 1}
+    con.execute("DELETE FROM main_marts.fact_transactions WHERE tx_id > 1500")
+    for _ in range(2):  # the second run scores a copy of the first day, a day later and 3x larger
+        run(con, model, 3)
+        fraud_isoforest.update_alert_stats(con, [max(fraud_isoforest.SCORES.glob("*.parquet"))])
+        con.execute("INSERT INTO main_marts.fact_transactions SELECT tx_id + 5000, customer_id, branch_id, channel, "
+                    "amount * 3, ts + INTERVAL 1 DAY FROM main_marts.fact_transactions WHERE tx_id <= 1500")
+    stats = con.execute("select scored, threshold, alerts from main_marts.fraud_alert_stats").fetchone()
+    scores = con.execute(f"select fraud_score from "
+                         f"read_parquet('{fraud_isoforest.SCORES.as_posix()}/*.parquet')").fetchnumpy()["fraud_score"]
+    assert stats[0] == len(scores) == 3000
+    assert stats[2] == (scores >= stats[1]).sum() and 0 < stats[2] <= 30
+    below = np.floor(scores[scores < stats[1]].max() * fraud_isoforest.SCORE_BINS) / fraud_isoforest.SCORE_BINS
+    assert (scores >= below).sum() > 30  # the next occupied bin down would take it past 1%
+    con.execute("DROP TABLE main_marts.fraud_score_histogram")  # a missing histogram is seeded from every part
+    fraud_isoforest.update_alert_stats(con, [])
+    assert con.execute("select scored, threshold, alerts from main_marts.fraud_alert_stats").fetchone() == stats
@@ -0,0 +1,69 @@
+import http.client, json, threading
+import numpy as np, pytest
+from http.server import HTTPServer
+from fraud_isoforest import FEATURE_NAMES, build
+from fraud_online import CompiledForest, CustomerStats, OnlineScorer, serve
+
+
+@pytest.fixture(scope="module")
+def scorer():
+    rng = np.random.default_rng(0)
+    x = np.column_stack([rng.gamma(2.0, 50.0, 5000), rng.normal(size=5000)])
+    stats = CustomerStats(max_id=8000)
+    stats.load(np.arange(4000), np.full(4000, 3), np.full(4000, 100.0), np.full(4000, 50.0))
+    return OnlineScorer({"model": build(x), "version": 1, "features": FEATURE_NAMES}, stats)
+
+def test_compiled_forest_matches_sklearn(scorer):
+    clf = build(np.random.default_rng(1).normal(size=(2000, 2)))
+    x = np.random.default_rng(2).normal(scale=3.0, size=(500, 2))
+    np.testing.assert_allclose(CompiledForest(clf).score(x), -clf.decision_function(x), atol=1e-12)
+
+def test_welford_and_chan_match_numpy():
+    rng = np.random.default_rng(3)
+    ids, x = rng.integers(0, 50, 3000), rng.gamma(2.0, 50.0, 3000)
+    one, batched = CustomerStats(8), CustomerStats(8)
+    for i, v in zip(ids, x):
+        one.update(i, v)
+    for part in np.array_split(np.arange(len(x)), 7):
+        batched.update_batch(ids[part], x[part])
+    for c in range(50):
+        v = x[ids == c]
+        for s in (one, batched):
+            assert s.n[c] == len(v)
+            assert s.mean[c] == pytest.approx(v.mean()) and s.m2[c] == pytest.approx(((v - v.mean()) ** 2).sum())
+
+@pytest.mark.parametrize("ids, amounts", [([-1], [5000.0]), ([1, 2], [5.0]), ([1.5], [5.0]), (["a"], [5.0]),
+                                          ([1], [float("nan")]), ([10**9], [5.0])])
+def test_bad_input_is_rejected_before_any_stats_change(scorer, ids, amounts):
+    before = [a.copy() for a in (scorer.stats.n, scorer.stats.mean, scorer.stats.m2)]
+    with pytest.raises(ValueError):
+        scorer.score_batch(ids, amounts)
+    with pytest.raises(ValueError):
+        scorer.score(ids[0], amounts[0]) if len(ids) == len(amounts) else scorer.stats.update_batch(ids, amounts)
+    for a, b in zip(before, (scorer.stats.n, scorer.stats.mean, scorer.stats.m2)):
+        np.testing.assert_array_equal(a, b)
+
+def test_server_answers_bad_requests_with_400(scorer, monkeypatch):
+    run, servers = HTTPServer.serve_forever, []
+    monkeypatch.setattr(HTTPServer, "serve_forever", lambda self: servers.append(self))
+    serve(scorer, 0); server = servers[0]
+    threading.Thread(target=run, args=(server,), daemon=True).start()
+    def post(body):
+        c = http.client.HTTPConnection(*server.server_address, timeout=10); c.request("POST", "/score", body)
+        r = c.getresponse(); out = r.status, r.read(); c.close(); return out
+    try:
+        for body in (b"{not json", b'{"customer_id": [1]}', b'{"customer_id": [1, 2], "amount": [1.0]}',
+                     b'{"customer_id": [-1], "amount": [5000.0]}', b'{"customer_id": [1000000000], "amount": [1.0]}',
+                     b"[1, 2]"):
+            assert post(body)[0] == 400
+        status, out = post(b'{"customer_id": [1, 2], "amount": [10.0, 20.0]}')
+        assert status == 200 and len(json.loads(out)["fraud_score"]) == 2
+    finally:
+        server.shutdown(); server.server_close()
+
+def test_growth_stops_at_max_id():
+    stats = CustomerStats(8, max_id=100)
+    stats.update_batch([90], [1.0]); stats.update(100, 2.0)
+    assert len(stats.n) == len(stats.mean) == len(stats.m2) == 101
+    with pytest.raises(ValueError):
+        stats.update(101, 1.0)
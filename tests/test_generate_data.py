@@ -0,0 +1,23 @@
+import numpy as np, pytest
+from generate_data import ParquetSink, generate, scale_profile
+
+NOW = np.datetime64("2025-01-01T00:00:00", "us")
+
+
+def files(root):
+    return {p.relative_to(root).as_posix(): p.read_bytes() for p in sorted(root.rglob("*.parquet"))}
+
+@pytest.mark.parametrize("workers", [2, 3])
+def test_output_does_not_depend_on_workers(tmp_path, workers):
+    profile = scale_profile(0.05)  # 150 customers in 4 shards of 40
+    serial = generate(ParquetSink(tmp_path/"serial"), profile, seed=7, now=NOW, chunk_size=40, workers=1)
+    pooled = generate(ParquetSink(tmp_path/"pooled"), profile, seed=7, now=NOW, chunk_size=40, workers=workers)
+    assert serial == pooled and all(serial.values())
+    a, b = files(tmp_path/"serial"), files(tmp_path/"pooled")
+    assert len(a) > 10 and a == b
+
+def test_seed_changes_the_output(tmp_path):
+    profile = scale_profile(0.02)
+    generate(ParquetSink(tmp_path/"a"), profile, seed=1, now=NOW, chunk_size=30)
+    generate(ParquetSink(tmp_path/"b"), profile, seed=2, now=NOW, chunk_size=30)
+    assert files(tmp_path/"a") != files(tmp_path/"b")
@@ -0,0 +1,33 @@
+import load_to_duckdb
+
+def write_customers(path, rows):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("customer_id,age,tenure_months,province,risk_score,join_date\n" +
+                    "".join(f"{cid},{age},12,ON,50,2020-01-01\n" for cid, age in rows))
+
+def load(tmp_path, monkeypatch, append_only=False):
+    monkeypatch.setattr(load_to_duckdb, "RAW_PATH", tmp_path/"raw")
+    con = load_to_duckdb.connect(str(tmp_path/"w.duckdb"))
+    load_to_duckdb.load_table(con, "customers", append_only=append_only)
+    return con
+
+def test_new_file_upserts_late_rows_on_primary_key(tmp_path, monkeypatch):
+    write_customers(tmp_path/"raw/customers/part-0.csv", [(1, 30), (2, 40)])
+    load(tmp_path, monkeypatch).close()
+    write_customers(tmp_path/"raw/customers/part-1.csv", [(2, 41), (3, 50), (3, 51)])
+    con = load(tmp_path, monkeypatch)
+    assert con.execute("select count(*), count(distinct customer_id) from raw.customers").fetchone() == (3, 3)
+    assert con.execute("select age from raw.customers where customer_id = 2").fetchone() == (41,)
+
+def test_append_only_skips_the_key_check(tmp_path, monkeypatch):
+    write_customers(tmp_path/"raw/customers/part-0.csv", [(1, 30)])
+    load(tmp_path, monkeypatch).close()
+    write_customers(tmp_path/"raw/customers/part-1.csv", [(1, 31)])
+    con = load(tmp_path, monkeypatch, append_only=True)
+    assert con.execute("select count(*) from raw.customers").fetchone() == (2,)
+
+def test_last_row_wins_inside_one_file(tmp_path, monkeypatch):
+    # big enough for a parallel CSV scan; every key repeats 300 times and its last row has the largest age
+    write_customers(tmp_path/"raw/customers/part-0.csv", [(i % 1000, i // 1000) for i in range(300_000)])
+    con = load(tmp_path, monkeypatch)
+    assert con.execute("select count(*), min(age), max(age) from raw.customers").fetchone() == (1000, 299, 299)
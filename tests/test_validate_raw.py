@@ -0,0 +1,41 @@
+import numpy as np, pandas as pd
+import load_to_duckdb, validate_raw
+from validate_raw import BloomFilter, validate_table
+
+def write_transactions(path, tx_ids):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame({"tx_id": tx_ids, "customer_id": 1, "account_id": 1, "branch_id": 1, "amount": 10.0,
+                  "channel": "POS", "merchant_code": "5411", "ts": "2025-01-01 00:00:00"}).to_csv(path, index=False)
+
+def setup_raw(tmp_path, monkeypatch):
+    monkeypatch.setattr(load_to_duckdb, "RAW_PATH", tmp_path/"raw")
+    monkeypatch.setattr(validate_raw, "QUARANTINE", tmp_path/"quarantine")
+    write_transactions(tmp_path/"raw/transactions/part-0.csv", [1, 2, 3, 3])
+    write_transactions(tmp_path/"raw/transactions/part-1.csv", [4, 2, 5])
+
+def test_bloom_filter_has_no_false_negatives_and_the_expected_fp_rate():
+    keys = np.arange(100_000, dtype=np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+    bloom = BloomFilter(len(keys), len(keys) * 10 // 8)
+    assert not bloom.add(keys).any()
+    assert bloom.add(keys).all()
+    fresh = bloom.add(keys + np.uint64(1))
+    assert abs(fresh.mean() - bloom.fp_rate(len(keys))) < 0.01
+
+def test_duplicates_are_confirmed_on_key_values(tmp_path, monkeypatch):
+    setup_raw(tmp_path, monkeypatch)
+    stats = validate_table("transactions", 64, 100, 1.0, chunk_rows=2)
+    assert stats["duplicate_keys"] == 2
+    q = pd.read_csv(tmp_path/"quarantine/transactions.csv")
+    assert sorted(zip(q["tx_id"], q["line"])) == [(2, 3), (3, 5)]
+
+def test_hash_collisions_are_not_duplicates(tmp_path, monkeypatch):
+    setup_raw(tmp_path, monkeypatch)
+    monkeypatch.setattr(validate_raw, "key_hashes", lambda keys: np.zeros(len(keys), np.uint64))
+    assert validate_table("transactions", 64, 100, 1.0, chunk_rows=2)["duplicate_keys"] == 2
+
+def test_undersized_bloom_filter_warns_and_stays_exact(tmp_path, monkeypatch, capsys):
+    setup_raw(tmp_path, monkeypatch)
+    monkeypatch.setattr(validate_raw, "estimate_rows", lambda paths: 10**9)
+    stats = validate_table("transactions", 1, 100, 1.0, chunk_rows=2)
+    assert stats["bloom_hashes"] < validate_raw.MIN_BLOOM_HASHES and "Warning" in capsys.readouterr().err
+    assert stats["duplicate_keys"] == 2